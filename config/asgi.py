@@ -28,6 +28,11 @@ django_application = get_asgi_application()
 # Import websocket application here, so apps from django_application are loaded first
 from config.websocket import websocket_application  # noqa: E402
 
+# Start building the in-memory product suggestion index, if enabled.
+from mayfair_api.products.suggestions import suggestion_index  # noqa: E402
+
+suggestion_index.warm()
+
 
 async def application(scope, receive, send):
     if scope["type"] == "http":
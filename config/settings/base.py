@@ -70,6 +70,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -142,6 +143,7 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "mayfair_api.utils.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -306,6 +308,17 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-schedule
+CELERY_BEAT_SCHEDULE = {
+    "flush-product-popularity": {
+        "task": "mayfair_api.products.tasks.flush_product_popularity",
+        "schedule": 5 * 60,
+    },
+    "update-product-recommendations": {
+        "task": "mayfair_api.products.tasks.update_product_recommendations",
+        "schedule": 60 * 60,
+    },
+}
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#worker-send-task-events
 CELERY_WORKER_SEND_TASK_EVENTS = True
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_send_sent_event
@@ -344,6 +357,19 @@ REST_FRAMEWORK = {
         # "social_django.middleware.SocialAuthExceptionMiddleware",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "mayfair_api.utils.renderers.ORJSONRenderer",
+        "mayfair_api.utils.renderers.MessagePackRenderer",
+        "mayfair_api.utils.renderers.CBORRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "mayfair_api.utils.parsers.ORJSONParser",
+        "mayfair_api.utils.parsers.MessagePackParser",
+        "mayfair_api.utils.parsers.CBORParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
@@ -361,6 +387,16 @@ SPECTACULAR_SETTINGS = {
 }
 # Your stuff...
 # ------------------------------------------------------------------------------
+# "database" (pg_trgm queries) or "memory" (per-worker prefix index)
+PRODUCT_SUGGESTION_ENGINE = env(
+    "DJANGO_PRODUCT_SUGGESTION_ENGINE",
+    default="database",
+)
+# "values" (render list pages per request) or "cards" (pre-rendered JSON)
+PRODUCT_LIST_RENDERING = env("DJANGO_PRODUCT_LIST_RENDERING", default="values")
+# Seconds a changed product's card may still be served before it is
+# rendered inline instead
+PRODUCT_CARD_MAX_STALENESS = env.int("DJANGO_PRODUCT_CARD_MAX_STALENESS", default=60)
 
 
 SIMPLE_JWT = {
@@ -30,3 +30,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
 # file. This includes Django's development server, if the WSGI_APPLICATION
 # setting points here.
 application = get_wsgi_application()
+
+# Start building the in-memory product suggestion index, if enabled.
+from mayfair_api.products.suggestions import suggestion_index  # noqa: E402
+
+suggestion_index.warm()
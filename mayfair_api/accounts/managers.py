@@ -1,11 +1,12 @@
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.auth import get_user_model
 from django.contrib.auth.base_user import BaseUserManager
-from django.utils.crypto import get_random_string
+from django.db import IntegrityError, transaction
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
+from mayfair_api.utils.identifiers import ALLOCATION_ATTEMPTS, allocate_unique
+
 
 class UserManager(BaseUserManager):
     """
@@ -21,19 +22,22 @@ class UserManager(BaseUserManager):
             raise ValueError(_("The Email must be set"))
         email = self.normalize_email(email.lower())
         user = self.model(email=email, **extra_fields)
-        CustomUser = get_user_model()
-        url = slugify(user.first_name + "-" + user.last_name)
-
-        if not CustomUser.objects.filter(url=url):
-            user.url = url
-        else:
-            user.url = url + "-" + slugify(get_random_string(length=7))
-            # TODO: check if this new url exists as well
-        print(user.url)
-        user.first_name
         user.set_password(password)
-        user.save()
-        return user
+        base_url = slugify(user.first_name + "-" + user.last_name)
+
+        for attempt in range(ALLOCATION_ATTEMPTS):
+            allocated = allocate_unique(self.model, {"url": [base_url]}, bare=("url",))
+            user.url = allocated["url"][0]
+            try:
+                with transaction.atomic():
+                    user.save()
+            except IntegrityError:
+                # Only retry when another signup took the url in the meantime
+                url_taken = self.model.objects.filter(url=user.url).exists()
+                if not url_taken or attempt == ALLOCATION_ATTEMPTS - 1:
+                    raise
+            else:
+                return user
 
     def create_superuser(self, email, password, **extra_fields):
         """
@@ -3,13 +3,15 @@ from django.db import transaction
 from rest_framework import serializers
 
 
+from mayfair_api.products.fieldsets import SparseFieldsetMixin
 from mayfair_api.products.serializers import ProductSerializer
 from mayfair_api.products.models import Product
+from mayfair_api.products.popularity import PURCHASE, record_on_commit
 from mayfair_api.orders.models import Order, OrderItem, CartItem, ShippingMethod
 from mayfair_api.payments.models import Payment
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), source="product", write_only=True
@@ -32,7 +34,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         return value
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
 
     class Meta:
@@ -41,7 +43,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source="get_status_display", read_only=True)
     payment_method_display = serializers.CharField(
@@ -123,6 +125,7 @@ class CreateOrderSerializer(serializers.Serializer):
             status="pending",
         )
 
+        record_on_commit(PURCHASE, [item.product_id for item in cart_items])
         cart_items.delete()
         return order
 
@@ -1,10 +1,12 @@
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 
 
 from mayfair_api.orders.models import CartItem, Order
+from mayfair_api.products.fieldsets import product_prefetch
+from mayfair_api.products.popularity import CART, record_on_commit
 from mayfair_api.orders.serializers import (
     CartItemSerializer,
     OrderSerializer,
@@ -20,7 +22,12 @@ class CartViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return CartItem.objects.filter(user=self.request.user).select_related("product")
+        queryset = CartItem.objects.filter(user=self.request.user)
+        if self.request.method not in SAFE_METHODS:
+            return queryset.select_related("product")
+        return queryset.prefetch_related(
+            product_prefetch("product", self.request, ("product",))
+        )
 
     def perform_create(self, serializer):
         product = serializer.validated_data["product"]
@@ -36,6 +43,8 @@ class CartViewSet(viewsets.ModelViewSet):
             # cart_item.quantity += quantity
             cart_item.save()
 
+        record_on_commit(CART, [product.pk])
+
     @action(detail=False, methods=["delete"])
     def clear(self, request):
         self.get_queryset().delete()
@@ -51,7 +60,10 @@ class OrderViewSet(
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).prefetch_related("items")
+        return Order.objects.filter(user=self.request.user).prefetch_related(
+            "items",
+            product_prefetch("items__product", self.request, ("items", "product")),
+        )
 
     def get_serializer_class(self):
         if self.action == "create":
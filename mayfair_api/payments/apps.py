@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PaymentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mayfair_api.payments"
+
+    def ready(self):
+        from . import signals  # noqa: F401
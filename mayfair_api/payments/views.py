@@ -10,6 +10,7 @@ from mayfair_api.payments.serializers import PaymentSerializer, PaymentMethodSer
 from mayfair_api.payments.utils.paystack import PayStack
 from mayfair_api.orders.serializers import OrderSerializer
 from mayfair_api.orders.models import Order
+from mayfair_api.products.caching import VersionedResponseCacheMixin
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -230,7 +231,8 @@ class PaymentDetailView(generics.RetrieveAPIView):
         return Payment.objects.filter(order__customer=self.request.user)
 
 
-class PaymentMethodListView(generics.ListAPIView):
+class PaymentMethodListView(VersionedResponseCacheMixin, generics.ListAPIView):
+    cache_version = "payment_methods"
     queryset = PaymentMethod.objects.filter(is_active=True)
     serializer_class = PaymentMethodSerializer
     permission_classes = [permissions.AllowAny]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mayfair_api.products"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+
+def normalize_attribute(text):
+    return (text or "").strip().casefold()
+
+
+def build_attribute_maps(rows):
+    """
+    ``{product_id: {attribute name: [values]}}`` from
+    ``(product_id, attribute name, value)`` rows, lower-cased for matching.
+    """
+    maps = defaultdict(lambda: defaultdict(list))
+    for product_id, name, value in rows:
+        values = maps[product_id][normalize_attribute(name)]
+        value = normalize_attribute(value)
+        if value not in values:
+            values.append(value)
+    return {product_id: dict(values) for product_id, values in maps.items()}
+
+
+def update_attribute_maps(product_ids):
+    """Rewrite Product.attribute_map for the given products from their values."""
+    from .models import Product, ProductAttributeValue
+
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    maps = build_attribute_maps(
+        ProductAttributeValue.objects.filter(product_id__in=product_ids).values_list(
+            "product_id", "attribute__name", "value"
+        )
+    )
+    products = [
+        Product(pk=pk, attribute_map=maps.get(pk, {}))
+        for pk in Product.objects.filter(pk__in=product_ids).values_list(
+            "pk", flat=True
+        )
+    ]
+    Product.objects.bulk_update(products, ["attribute_map"], batch_size=500)
+
+
+def attribute_filter(value):
+    """Containment lookup for a "color:red,size:large" filter string."""
+    wanted = defaultdict(list)
+    for pair in value.split(","):
+        if ":" in pair:
+            name, attribute_value = pair.split(":", 1)
+            wanted[normalize_attribute(name)].append(
+                normalize_attribute(attribute_value)
+            )
+    return dict(wanted)
@@ -0,0 +1,194 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "products:version:{}"
+MODIFIED_KEY = "products:version:{}:modified"
+
+
+def get_version(name):
+    """
+    Current value of a named cache version counter.
+
+    A missing counter, whether new or evicted, starts from the time in
+    nanoseconds rather than 1, so it never repeats a version whose entries
+    may still be cached.
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(MODIFIED_KEY.format(name), int(time.time()), None)
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_modified(name):
+    """Unix time of the last bump of a version counter, if known."""
+    return cache.get(MODIFIED_KEY.format(name))
+
+
+def versions_tag(names):
+    """The current values of several version counters, as one string."""
+    return ".".join(str(get_version(name)) for name in names)
+
+
+def bump_version(name):
+    """
+    Invalidate everything cached under ``name`` by moving to a new version.
+
+    Old entries are never deleted; they simply stop being read and expire.
+    """
+    key = VERSION_KEY.format(name)
+    cache.set(MODIFIED_KEY.format(name), int(time.time()), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted: restart past every version handed out before.
+        version = time.time_ns()
+        if cache.add(key, version, None):
+            return version
+        return cache.incr(key)
+
+
+CATALOG_VERSION = "catalog"
+RESPONSE_KEY = "products:response:{}:{}:{}:{}"
+RESPONSE_STATS_KEY = "products:response:stats:{}:{}"
+RESPONSE_CACHE_TIMEOUT = 60 * 15
+
+
+def normalized_query(query_params):
+    """A stable digest of the query string, independent of parameter order."""
+    params = sorted(
+        (key, value) for key in query_params for value in query_params.getlist(key)
+    )
+    return hashlib.md5(urlencode(params).encode()).hexdigest()  # noqa: S324
+
+
+def record_response_cache(view_name, outcome):
+    key = RESPONSE_STATS_KEY.format(view_name, outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def response_cache_stats(view_names):
+    keys = {
+        (name, outcome): RESPONSE_STATS_KEY.format(name, outcome)
+        for name in view_names
+        for outcome in ("hit", "miss")
+    }
+    values = cache.get_many(keys.values())
+    return {
+        name: {
+            outcome: values.get(keys[name, outcome], 0) for outcome in ("hit", "miss")
+        }
+        for name in view_names
+    }
+
+
+class VersionedResponseCacheMixin:
+    """
+    Cache GET responses keyed by the negotiated format, the normalized query
+    string and a version.
+
+    Writes that affect the response bump ``cache_version`` (see
+    products.signals), which invalidates every cached page in O(1).
+    ``get_extra_versions`` names further counters a request depends on. Each
+    response carries an ``X-Cache: HIT|MISS`` header and hit/miss counts are
+    kept per view in the cache.
+    """
+
+    cache_version = CATALOG_VERSION
+    cache_timeout = RESPONSE_CACHE_TIMEOUT
+
+    def get_extra_versions(self, request):
+        return []
+
+    def get_response_cache_key(self, request):
+        return RESPONSE_KEY.format(
+            type(self).__name__,
+            versions_tag([self.cache_version, *self.get_extra_versions(request)]),
+            request.accepted_renderer.format,
+            normalized_query(request.query_params),
+        )
+
+    def get(self, request, *args, **kwargs):
+        view_name = type(self).__name__
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record_response_cache(view_name, "hit")
+            response = Response(data, headers={"X-Cache": "HIT"})
+        else:
+            response = super().get(request, *args, **kwargs)
+            record_response_cache(view_name, "miss")
+            response["X-Cache"] = "MISS"
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, self.cache_timeout)
+
+        # Lets CompressionMiddleware cache the compressed body alongside.
+        response.response_cache_key = key
+        response.response_cache_timeout = self.cache_timeout
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs with 304 before any query or serialization.
+
+    The ETag is derived from the request path, query string, negotiated
+    format and the ``etag_version`` counter (plus any from
+    ``get_extra_versions``), and Last-Modified from the time those counters
+    were last bumped, so neither needs the database.
+    """
+
+    etag_version = CATALOG_VERSION
+
+    def get_extra_versions(self, request):
+        return []
+
+    def get_etag_versions(self, request):
+        return [self.etag_version, *self.get_extra_versions(request)]
+
+    def get_last_modified(self, request):
+        times = [get_modified(name) for name in self.get_etag_versions(request)]
+        times = [value for value in times if value is not None]
+        return max(times) if times else None
+
+    def get_etag(self, request):
+        raw = ":".join(
+            [
+                request.path,
+                normalized_query(request.query_params),
+                request.accepted_renderer.format,
+                versions_tag(self.get_etag_versions(request)),
+            ]
+        )
+        return f'"{hashlib.md5(raw.encode()).hexdigest()}"'  # noqa: S324
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        last_modified = self.get_last_modified(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ["Accept"])
+        return response
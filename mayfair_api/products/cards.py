@@ -0,0 +1,141 @@
+"""
+Pre-rendered product cards for ``PRODUCT_LIST_RENDERING = "cards"``.
+
+Each product's default listing representation is rendered once with the
+fast path, encoded exactly as the JSON renderer would, and stored in
+ProductCard. List pages then splice the stored strings into the response
+(see ``PrerenderedJSONRenderer``) instead of rendering rows.
+
+Changes to a product, its images or attribute values, its category or its
+vendor mark the card stale and queue a rebuild. Stale cards keep being
+served for up to ``PRODUCT_CARD_MAX_STALENESS`` seconds; after that, and for
+products with no card yet, the row is rendered inline and a rebuild is
+queued. Rebuilds bump the catalog version, so cached responses and ETags
+that captured a stale card are dropped with it. Image URLs in cards come
+straight from storage, so they are only absolute when ``MEDIA_URL`` is, as it
+is with S3.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from mayfair_api.utils.renderers import ORJSONRenderer
+
+from .caching import CATALOG_VERSION, bump_version
+from .fastpath import PRODUCT_COLUMNS, render_products
+from .models import Product, ProductCard
+
+REBUILD_CHUNK_SIZE = 500
+
+
+def is_enabled():
+    return getattr(settings, "PRODUCT_LIST_RENDERING", "values") == "cards"
+
+
+def encode_card(data):
+    return ORJSONRenderer().render(data).decode()
+
+
+def render_card_bodies(product_ids):
+    """``{product id: encoded card}`` for the given products."""
+    rows = Product.objects.filter(pk__in=product_ids).values(*PRODUCT_COLUMNS.values())
+    return {data["id"]: encode_card(data) for data in render_products(list(rows), None)}
+
+
+def rebuild_cards(product_ids):
+    """Render and store cards; returns how many were written."""
+    started = timezone.now()
+    bodies = render_card_bodies(product_ids)
+    ProductCard.objects.bulk_create(
+        [
+            ProductCard(product_id=pk, body=body, rendered_at=started)
+            for pk, body in bodies.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["body", "rendered_at"],
+    )
+    # Changes seen while rendering keep their card stale.
+    ProductCard.objects.filter(product_id__in=bodies, stale_since__lte=started).update(
+        stale_since=None
+    )
+    if bodies:
+        # Cached pages and ETags may hold the stale cards these replace.
+        transaction.on_commit(lambda: bump_version(CATALOG_VERSION))
+    return len(bodies)
+
+
+def mark_stale(product_ids):
+    """Flag cards as out of date and queue their rebuild after commit."""
+    from .tasks import rebuild_product_cards
+
+    product_ids = list(set(product_ids))
+    if not product_ids or not is_enabled():
+        return
+    ProductCard.objects.filter(
+        product_id__in=product_ids, stale_since__isnull=True
+    ).update(stale_since=timezone.now())
+    for start in range(0, len(product_ids), REBUILD_CHUNK_SIZE):
+        chunk = product_ids[start : start + REBUILD_CHUNK_SIZE]
+        transaction.on_commit(lambda chunk=chunk: rebuild_product_cards.delay(chunk))
+
+
+def get_card_bodies(product_ids):
+    """
+    Encoded cards for ``product_ids`` in order. Missing cards and cards
+    stale for longer than the bound are rendered inline and queued for a
+    rebuild.
+    """
+    from .tasks import rebuild_product_cards
+
+    cutoff = timezone.now() - timedelta(seconds=settings.PRODUCT_CARD_MAX_STALENESS)
+    bodies = {
+        pk: body
+        for pk, body, stale_since in ProductCard.objects.filter(
+            product_id__in=product_ids
+        ).values_list("product_id", "body", "stale_since")
+        if stale_since is None or stale_since >= cutoff
+    }
+    missing = [pk for pk in product_ids if pk not in bodies]
+    if missing:
+        bodies.update(render_card_bodies(missing))
+        transaction.on_commit(lambda: rebuild_product_cards.delay(missing))
+    return PrerenderedList(bodies[pk] for pk in product_ids if pk in bodies)
+
+
+class PrerenderedList(list):
+    """Already-encoded JSON values, emitted verbatim as a JSON array."""
+
+    def encode(self):
+        return ("[" + ",".join(self) + "]").encode()
+
+
+class PrerenderedJSONRenderer(ORJSONRenderer):
+    """
+    ORJSONRenderer that splices ``PrerenderedList`` values, at the top level
+    or as values of a top-level dict, into the output without re-encoding.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, PrerenderedList):
+            return data.encode()
+        if not isinstance(data, dict) or not any(
+            isinstance(value, PrerenderedList) for value in data.values()
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        placeholders = {}
+        envelope = {}
+        for key, value in data.items():
+            if isinstance(value, PrerenderedList):
+                token = f"__prerendered_{len(placeholders)}__"
+                placeholders[token] = value
+                value = token
+            envelope[key] = value
+        body = super().render(envelope, accepted_media_type, renderer_context)
+        for token, value in placeholders.items():
+            body = body.replace(f'"{token}"'.encode(), value.encode(), 1)
+        return body
@@ -0,0 +1,101 @@
+import logging
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .caching import CATALOG_VERSION, bump_version, get_version
+from .models import Category
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_TREE_VERSION = "category_tree"
+CATEGORY_TREE_KEY = "products:category_tree:{}"
+CATEGORY_TREE_TIMEOUT = 60 * 60 * 24
+
+
+def build_category_tree():
+    """
+    Nested ``children`` lists for every category, from a single query.
+
+    Image URLs are as storage gives them; see ``absolute_image_urls``.
+    """
+    rows = list(
+        Category.objects.order_by("path", "id").values(
+            "id", "name", "slug", "image", "description", "parent_id"
+        )
+    )
+    nodes = {}
+    for row in rows:
+        row["image"] = default_storage.url(row["image"]) if row["image"] else None
+        row["children"] = []
+        nodes[row["id"]] = row
+    # Attached in a second pass: stale paths don't order parents first.
+    roots = []
+    for row in rows:
+        parent_id = row.pop("parent_id")
+        if parent_id is None:
+            roots.append(row)
+        elif parent_id in nodes:
+            nodes[parent_id]["children"].append(row)
+    return roots
+
+
+def absolute_image_urls(tree, request):
+    """A copy of ``tree`` with image URLs made absolute, as serializers do."""
+    return [
+        {
+            **node,
+            "image": request.build_absolute_uri(node["image"])
+            if node["image"]
+            else None,
+            "children": absolute_image_urls(node["children"], request),
+        }
+        for node in tree
+    ]
+
+
+def get_category_tree():
+    """The category tree, cached until the next Category save or delete."""
+    key = CATEGORY_TREE_KEY.format(get_version(CATEGORY_TREE_VERSION))
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(key, tree, CATEGORY_TREE_TIMEOUT)
+    return tree
+
+
+def rebuild_category_paths():
+    """
+    Recompute every ``Category.path`` from the parent links, for categories
+    written without ``Category.save()`` (``bulk_create``, ``loaddata``).
+
+    Returns how many paths changed. Categories in a parent cycle can't be
+    placed; they are left with an empty path and logged.
+    """
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    children = {}
+    for pk, parent_id in parents.items():
+        children.setdefault(parent_id, []).append(pk)
+    paths = {}
+    stack = [(pk, "") for pk in children.get(None, [])]
+    while stack:
+        pk, parent_path = stack.pop()
+        paths[pk] = f"{parent_path}{pk}/"
+        stack.extend((child, paths[pk]) for child in children.get(pk, []))
+    unplaced = parents.keys() - paths.keys()
+    if unplaced:
+        logger.warning("Categories in a parent cycle: %s", sorted(unplaced))
+
+    current = dict(Category.objects.values_list("id", "path"))
+    changed = [
+        Category(pk=pk, path=paths.get(pk, ""))
+        for pk in parents
+        if current[pk] != paths.get(pk, "")
+    ]
+    with transaction.atomic():
+        Category.objects.bulk_update(changed, ["path"], batch_size=500)
+        if changed:
+            transaction.on_commit(lambda: bump_version(CATEGORY_TREE_VERSION))
+            transaction.on_commit(lambda: bump_version(CATALOG_VERSION))
+    return len(changed)
@@ -0,0 +1,119 @@
+"""
+Streaming catalog export as NDJSON or CSV.
+
+Active products are read in id order through a server-side cursor,
+``EXPORT_CHUNK_SIZE`` rows at a time. Each chunk gets its images and
+attribute values with one grouped query each (see
+``fastpath.render_products``) and is encoded and sent before the next chunk
+is read, so memory stays flat whatever the catalog size.
+
+Rows have the ``ProductSerializer`` shape and honour ``?fields=``. In CSV the
+nested ``images``, ``attribute_values`` and ``feature_image`` columns hold
+compact JSON.
+"""
+
+import csv
+from itertools import batched
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework.renderers import BaseRenderer
+
+from mayfair_api.utils.renderers import ORJSONRenderer
+
+from .fastpath import listing_fields, product_values, render_products
+from .models import Product
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+class NDJSONExportRenderer(BaseRenderer):
+    """Negotiates ``?format=ndjson``; ``ProductExportView`` streams the body."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+
+class CSVExportRenderer(BaseRenderer):
+    """Negotiates ``?format=csv``; ``ProductExportView`` streams the body."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+
+EXPORT_FORMATS = (NDJSONExportRenderer.format, CSVExportRenderer.format)
+
+
+def export_queryset(updated_since=None):
+    queryset = Product.objects.filter(is_active=True).order_by("id")
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return queryset
+
+
+def iter_product_chunks(queryset, request=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Lists of rendered products, one per chunk of the cursor."""
+    rows = product_values(queryset, request).iterator(chunk_size=chunk_size)
+    for chunk in batched(rows, chunk_size):
+        yield render_products(list(chunk), request)
+
+
+def ndjson_chunks(product_chunks):
+    renderer = ORJSONRenderer()
+    for products in product_chunks:
+        yield b"".join(renderer.render(product) + b"\n" for product in products)
+
+
+class _Echo:
+    # csv.writer target that hands each formatted row back to the caller.
+    def write(self, value):
+        return value
+
+
+def _csv_value(value, renderer):
+    if value is None:
+        return ""
+    if isinstance(value, list | dict):
+        return renderer.render(value).decode()
+    return value
+
+
+def csv_chunks(product_chunks, names):
+    writer = csv.writer(_Echo())
+    renderer = ORJSONRenderer()
+    yield writer.writerow(names).encode()
+    for products in product_chunks:
+        yield "".join(
+            writer.writerow([_csv_value(product[name], renderer) for name in names])
+            for product in products
+        ).encode()
+
+
+def export_chunks(queryset, export_format, request=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encoded ``export_format`` output for ``queryset``, one chunk at a time."""
+    product_chunks = iter_product_chunks(queryset, request, chunk_size)
+    if export_format == CSVExportRenderer.format:
+        return csv_chunks(product_chunks, listing_fields(request))
+    return ndjson_chunks(product_chunks)
+
+
+async def _aiter_chunks(chunks):
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def streaming_content(chunks, request):
+    """
+    Under ASGI, Django reads a sync iterator to the end before sending any
+    of it, so give it an async one that pulls each chunk on the thread that
+    holds the database connection and cursor.
+    """
+    if isinstance(request, ASGIRequest):
+        return _aiter_chunks(chunks)
+    return chunks
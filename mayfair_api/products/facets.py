@@ -0,0 +1,108 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .caching import CATALOG_VERSION, get_version
+from .models import Product, ProductAttributeValue
+
+FACET_CHOICES = ("category", "price", "attributes")
+# Lower bounds of the price buckets; the last bucket is open-ended.
+PRICE_BUCKETS = (0, 10, 25, 50, 100, 250, 500, 1000)
+FACET_CACHE_TIMEOUT = 60 * 15
+# Query params that change paging or order but not the filtered set.
+NON_FILTER_PARAMS = ("cursor", "page_size", "ordering", "facets")
+
+
+def parse_facets(value):
+    requested = [name.strip() for name in (value or "").split(",")]
+    return [name for name in FACET_CHOICES if name in requested]
+
+
+def facet_cache_key(query_params, facets):
+    params = sorted(
+        (key, value)
+        for key in query_params
+        if key not in NON_FILTER_PARAMS
+        for value in query_params.getlist(key)
+    )
+    raw = f"{','.join(facets)}?{urlencode(params)}"
+    digest = hashlib.md5(raw.encode()).hexdigest()  # noqa: S324
+    return f"products:facets:{get_version(CATALOG_VERSION)}:{digest}"
+
+
+def category_facet(products):
+    return [
+        {
+            "id": row["category__id"],
+            "name": row["category__name"],
+            "slug": row["category__slug"],
+            "count": row["count"],
+        }
+        for row in products.values("category__id", "category__name", "category__slug")
+        .annotate(count=Count("id"))
+        .order_by("-count", "category__name")
+    ]
+
+
+def price_facet(products):
+    bounds = list(zip(PRICE_BUCKETS, (*PRICE_BUCKETS[1:], None), strict=True))
+    counts = products.aggregate(
+        **{
+            f"bucket_{index}": Count(
+                "id",
+                filter=Q(effective_price__gte=low)
+                & (Q(effective_price__lt=high) if high else Q()),
+            )
+            for index, (low, high) in enumerate(bounds)
+        }
+    )
+    return [
+        {"min": low, "max": high, "count": counts[f"bucket_{index}"]}
+        for index, (low, high) in enumerate(bounds)
+    ]
+
+
+def attribute_facet(products):
+    rows = (
+        ProductAttributeValue.objects.filter(product__in=products.values("pk"))
+        .values("attribute__name", "value")
+        .annotate(count=Count("product", distinct=True))
+        .order_by("attribute__name", "-count", "value")
+    )
+    facet = {}
+    for row in rows:
+        facet.setdefault(row["attribute__name"], []).append(
+            {"value": row["value"], "count": row["count"]}
+        )
+    return facet
+
+
+FACET_BUILDERS = {
+    "category": category_facet,
+    "price": price_facet,
+    "attributes": attribute_facet,
+}
+
+
+def compute_facets(queryset, facets, query_params):
+    """
+    Counts for the requested facets over the filtered ``queryset``.
+
+    Each facet is a single aggregate query over the matching product ids, so
+    the cost is bounded by the number of facets rather than by categories or
+    attribute values. Results are cached per normalized filter key and
+    catalog version.
+    """
+    cache_key = facet_cache_key(query_params, facets)
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    # Re-select by id so ordering, ranking and prefetches don't leak into
+    # the aggregates.
+    products = Product.objects.filter(pk__in=queryset.order_by().values("pk"))
+    result = {name: FACET_BUILDERS[name](products) for name in facets}
+    cache.set(cache_key, result, FACET_CACHE_TIMEOUT)
+    return result
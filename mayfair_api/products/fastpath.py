@@ -0,0 +1,173 @@
+"""
+Serializer-free rendering of product listings.
+
+``ProductListView`` GETs read flat rows with ``values()``, fetch images and
+attribute values with one grouped query each for the whole page, and build
+plain dicts in the same shape as ``ProductSerializer``. The column values
+are formatted by the same DRF field classes the serializer uses, so the JSON
+is identical. Only the field and row loops run per product; no model
+instances or nested serializers are created.
+"""
+
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from .fieldsets import FIELDS_PARAM, requested_names
+from .images import derivative_srcset
+from .models import ProductAttributeValue, ProductImage
+
+# ProductSerializer.Meta.fields and the values() column behind each one.
+PRODUCT_COLUMNS = {
+    "id": "id",
+    "vendor": "vendor__business_name",
+    "category": "category_id",
+    "name": "name",
+    "slug": "slug",
+    "description": "description",
+    "short_description": "short_description",
+    "price": "price",
+    "discount_price": "discount_price",
+    "stock": "stock",
+    "sku": "sku",
+    "is_active": "is_active",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+RELATED_FIELDS = ("images", "attribute_values")
+# Columns the keyset paginator may order and seek on.
+ORDERING_COLUMNS = (
+    "effective_price",
+    "price",
+    "discount_price",
+    "created_at",
+    "updated_at",
+    "name",
+    "stock",
+    "popularity",
+)
+
+_decimal = serializers.DecimalField(max_digits=10, decimal_places=2)
+_datetime = serializers.DateTimeField()
+FORMATTERS = {
+    "price": _decimal.to_representation,
+    "discount_price": _decimal.to_representation,
+    "created_at": _datetime.to_representation,
+    "updated_at": _datetime.to_representation,
+}
+
+
+def keyset_columns(queryset):
+    """
+    Columns the keyset paginator may order and seek on, including
+    annotations such as ``search_rank``.
+    """
+    return ("id", *ORDERING_COLUMNS, *queryset.query.annotations)
+
+
+def product_values(queryset, request):
+    """The values() queryset behind a fast-path listing page."""
+    selected = requested_names(request, FIELDS_PARAM)
+    columns = {
+        column
+        for name, column in PRODUCT_COLUMNS.items()
+        if selected is None or name in selected
+    }
+    columns.update(keyset_columns(queryset))
+    return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+
+def _file_url(name, request):
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _images_by_product(product_ids, request):
+    images = {}
+    rows = (
+        ProductImage.objects.filter(product_id__in=product_ids)
+        .order_by("id")
+        .values_list(
+            "product_id", "id", "image", "image_derivatives", "alt_text", "is_feature"
+        )
+    )
+    for product_id, pk, name, derivatives, alt_text, is_feature in rows:
+        images.setdefault(product_id, []).append(
+            {
+                "id": pk,
+                "image": _file_url(name, request) if name else None,
+                "srcset": derivative_srcset(name, derivatives, request),
+                "alt_text": alt_text,
+                "is_feature": is_feature,
+            }
+        )
+    return images
+
+
+def _attributes_by_product(product_ids):
+    attributes = {}
+    rows = (
+        ProductAttributeValue.objects.filter(product_id__in=product_ids)
+        .order_by("id")
+        .values_list("product_id", "attribute__name", "value")
+    )
+    for product_id, attribute, value in rows:
+        attributes.setdefault(product_id, []).append(
+            {"attribute": attribute, "value": value}
+        )
+    return attributes
+
+
+def _feature_image(images):
+    if not images:
+        return None
+    image = min(images, key=lambda image: (not image["is_feature"], image["id"]))
+    return {"image": image["image"], "srcset": image["srcset"]}
+
+
+def listing_fields(request):
+    """Field names, in output order, of fast-path products for ``request``."""
+    selected = requested_names(request, FIELDS_PARAM)
+    names = [
+        name
+        for name in (*PRODUCT_COLUMNS, *RELATED_FIELDS)
+        if selected is None or name in selected
+    ]
+    if selected is not None and "feature_image" in selected:
+        names.append("feature_image")
+    return names
+
+
+def render_products(rows, request):
+    """``ProductSerializer(many=True).data`` for values() rows of one page."""
+    names = listing_fields(request)
+
+    product_ids = [row["id"] for row in rows]
+    images = (
+        _images_by_product(product_ids, request)
+        if product_ids and ("images" in names or "feature_image" in names)
+        else {}
+    )
+    attributes = (
+        _attributes_by_product(product_ids)
+        if product_ids and "attribute_values" in names
+        else {}
+    )
+
+    results = []
+    for row in rows:
+        item = {}
+        for name in names:
+            if name == "images":
+                item[name] = images.get(row["id"], [])
+            elif name == "attribute_values":
+                item[name] = attributes.get(row["id"], [])
+            elif name == "feature_image":
+                item[name] = _feature_image(images.get(row["id"]))
+            else:
+                value = row[PRODUCT_COLUMNS[name]]
+                formatter = FORMATTERS.get(name)
+                item[name] = (
+                    formatter(value) if formatter and value is not None else value
+                )
+        results.append(item)
+    return results
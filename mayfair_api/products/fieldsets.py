@@ -0,0 +1,132 @@
+"""
+Sparse fieldsets (``?fields=``) and expansion (``?expand=``) for read requests.
+
+Both params take comma-separated names; dotted names reach nested
+serializers, e.g. ``/api/orders/cart/?fields=quantity,product.name,product.price``.
+A serializer only filters when at least one name addresses its level, so
+``?fields=quantity,product`` keeps the whole nested product. Without the
+params, responses keep their full default shape.
+"""
+
+from django.db.models import Prefetch
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+# Large or internal columns not needed unless their field is requested.
+DEFERRABLE_PRODUCT_FIELDS = (
+    "description",
+    "short_description",
+    "search_vector",
+    "attribute_map",
+)
+PRODUCT_PREFETCHES = {
+    "images": ("images",),
+    "attribute_values": ("attribute_values", "attribute_values__attribute"),
+}
+PRODUCT_SELECT_RELATED = ("vendor", "category")
+
+
+def requested_names(request, param, path=()):
+    """
+    Names requested by ``param`` at the serializer nested under ``path``, or
+    ``None`` when none address that level (or it isn't a read request).
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    depth = len(path)
+    names = set()
+    for entry in value.split(","):
+        parts = entry.strip().split(".")
+        if len(parts) > depth and tuple(parts[:depth]) == tuple(path):
+            names.add(parts[depth])
+    return names or None
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin honouring ``?fields=`` and ``?expand=``.
+
+    ``optional_fields`` are left out unless explicitly requested;
+    ``expandable_fields`` maps a field name to a factory for the richer field
+    that replaces it under ``?expand=``.
+    """
+
+    optional_fields = ()
+    expandable_fields = {}
+
+    def field_path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(path))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        path = self.field_path()
+
+        for name in requested_names(request, EXPAND_PARAM, path) or ():
+            if name in self.expandable_fields:
+                fields[name] = self.expandable_fields[name]()
+
+        selected = requested_names(request, FIELDS_PARAM, path)
+        if selected is None:
+            for name in self.optional_fields:
+                fields.pop(name, None)
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+def sparse_product_queryset(queryset, request, path=(), prefetches=PRODUCT_PREFETCHES):
+    """
+    Trim a Product queryset to what ``?fields=`` asks for: defer unrequested
+    large columns and drop joins and prefetches for unrequested relations.
+    ``feature_image`` is annotated rather than served from every image.
+    """
+    from .models import feature_image_data
+
+    selected = requested_names(request, FIELDS_PARAM, path)
+    if selected is None:
+        return queryset
+
+    deferred = [name for name in DEFERRABLE_PRODUCT_FIELDS if name not in selected]
+    if deferred:
+        queryset = queryset.defer(*deferred)
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    related = [name for name in PRODUCT_SELECT_RELATED if name in selected]
+    if related:
+        queryset = queryset.select_related(*related)
+    lookups = [
+        lookup
+        for name, relation_lookups in prefetches.items()
+        if name in selected
+        for lookup in relation_lookups
+    ]
+    if lookups:
+        queryset = queryset.prefetch_related(*lookups)
+    if "feature_image" in selected:
+        queryset = queryset.annotate(feature_image_data=feature_image_data())
+    return queryset
+
+
+def product_prefetch(lookup, request, path):
+    """
+    A ``Prefetch`` loading products for a nested ProductSerializer at
+    ``path`` (e.g. cart items' ``product``) with only the joins, prefetches
+    and columns its requested fields need.
+    """
+    from .models import Product
+
+    queryset = Product.objects.select_related(*PRODUCT_SELECT_RELATED).prefetch_related(
+        *(name for lookups in PRODUCT_PREFETCHES.values() for name in lookups)
+    )
+    return Prefetch(lookup, queryset=sparse_product_queryset(queryset, request, path))
@@ -1,6 +1,8 @@
 import django_filters
 from django.db.models import Q
 from .models import Product, Category, ProductAttributeValue
+from .search import search_products
+from .attributes import attribute_filter
 
 
 class ProductFilter(django_filters.FilterSet):
@@ -9,8 +11,13 @@ class ProductFilter(django_filters.FilterSet):
     sku = django_filters.CharFilter(lookup_expr="iexact")
     slug = django_filters.CharFilter(lookup_expr="iexact")
 
-    min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
-    max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    # Ranges and ordering on "price" use the price actually charged
+    min_price = django_filters.NumberFilter(
+        field_name="effective_price", lookup_expr="gte"
+    )
+    max_price = django_filters.NumberFilter(
+        field_name="effective_price", lookup_expr="lte"
+    )
 
     min_discount_price = django_filters.NumberFilter(
         field_name="discount_price", lookup_expr="gte"
@@ -31,11 +38,12 @@ class ProductFilter(django_filters.FilterSet):
 
     ordering = django_filters.OrderingFilter(
         fields=(
-            ("price", "price"),
+            ("effective_price", "price"),
             ("discount_price", "discount_price"),
             ("created_at", "created_at"),
             ("updated_at", "updated_at"),
             ("name", "name"),
+            ("popularity", "popularity"),
         ),
         field_labels={
             "price": "Price",
@@ -43,6 +51,7 @@ class ProductFilter(django_filters.FilterSet):
             "created_at": "Creation Date",
             "updated_at": "Last Updated",
             "name": "Product Name",
+            "popularity": "Popularity",
         },
     )
 
@@ -61,30 +70,31 @@ class ProductFilter(django_filters.FilterSet):
         return queryset.filter(stock=0)
 
     def filter_category(self, queryset, name, value):
-        try:
-            # Try to get category by ID first
-            return queryset.filter(category__id=value)
-        except ValueError:
-            # If not an ID, try by slug
-            return queryset.filter(category__slug=value)
+        # Match the category and its whole subtree through the materialized path
+        categories = Category.objects.filter(
+            Q(id=value) if value.isdigit() else Q(slug=value)
+        )
+        category = categories.values_list("id", "path").first()
+        if category is None:
+            return queryset.none()
+        category_id, path = category
+        if not path:
+            # No path yet (bulk_create, loaddata); "" would match everything.
+            return queryset.filter(category_id=category_id)
+        return queryset.filter(
+            category__in=Category.objects.filter(path__startswith=path)
+        )
 
     def filter_attributes(self, queryset, name, value):
         # Expected format: "color:red,size:large"
-        attributes = value.split(",")
-
-        for attr in attributes:
-            if ":" in attr:
-                attr_name, attr_value = attr.split(":", 1)
-                queryset = queryset.filter(
-                    attribute_values__attribute__name__iexact=attr_name.strip(),
-                    attribute_values__value__iexact=attr_value.strip(),
-                )
-        return queryset.distinct()
+        # One GIN-indexed containment check on the denormalized attribute map
+        attributes = attribute_filter(value)
+        if not attributes:
+            return queryset
+        return queryset.filter(attribute_map__contains=attributes)
 
     def filter_search(self, queryset, name, value):
-        return queryset.filter(
-            Q(name__icontains=value)
-            | Q(description__icontains=value)
-            | Q(sku__icontains=value)
-            | Q(attribute_values__value__icontains=value)
-        ).distinct()
+        # Ranked full-text match against the indexed Product.search_vector
+        if not value.strip():
+            return queryset
+        return search_products(queryset, value)
@@ -0,0 +1,137 @@
+"""
+Resized derivatives of product and category images.
+
+After an upload commits, ``tasks.generate_image_derivatives`` renders the
+original at each of ``DERIVATIVE_WIDTHS`` in each available format and
+records the storage names in the model's derivatives field::
+
+    {"source": "product_images/shoe.jpg",
+     "webp": {"320": "product_images/derivatives/shoe-320.webp", ...},
+     "jpeg": {...}}
+
+``source`` ties the derivatives to the upload they were made from, so a
+replaced image stops advertising stale derivatives until it is re-rendered.
+
+Uploads are confirmed from their storage metadata alone, so this is also
+where an original is first decoded: one that isn't an intact image raises
+``InvalidImageError``.
+
+Each image is decoded once and rendered inline by its own task. Prefork
+Celery workers are daemonic and cannot start a process pool of their own,
+so images render in parallel across the worker's processes (its
+``--concurrency``) instead.
+"""
+
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DERIVATIVE_WIDTHS = (320, 640, 1024, 1600)
+# AVIF is only produced when the installed Pillow can encode it.
+DERIVATIVE_FORMATS = ("avif", "webp", "jpeg")
+DERIVATIVE_QUALITY = {"avif": 50, "webp": 75, "jpeg": 80}
+DERIVATIVE_EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+
+
+class InvalidImageError(ValueError):
+    """The stored original isn't an intact image Pillow can read."""
+
+
+def available_formats():
+    Image.init()
+    return [name for name in DERIVATIVE_FORMATS if name.upper() in Image.SAVE]
+
+
+def derivative_widths(original_width):
+    # Never upscale; a small original gets a single derivative at its own size.
+    widths = [width for width in DERIVATIVE_WIDTHS if width < original_width]
+    return widths or [original_width]
+
+
+def render_derivative(image, width, image_format):
+    """Encode the decoded ``image`` resized to ``width`` pixels wide."""
+    if image_format == "jpeg" and image.mode not in ("RGB", "L"):
+        converted = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L"):
+        converted = image.convert("RGBA")
+    else:
+        converted = image
+    height = max(1, round(converted.height * width / converted.width))
+    resized = converted.resize((width, height), Image.Resampling.LANCZOS)
+    output = BytesIO()
+    resized.save(
+        output,
+        image_format.upper(),
+        quality=DERIVATIVE_QUALITY[image_format],
+        optimize=image_format == "jpeg",
+    )
+    return output.getvalue()
+
+
+def derivative_name(source, width, image_format):
+    path = PurePosixPath(source)
+    extension = DERIVATIVE_EXTENSIONS[image_format]
+    return str(path.parent / "derivatives" / f"{path.stem}-{width}.{extension}")
+
+
+def build_derivatives(field_file):
+    """
+    Render and store derivatives for ``field_file``; returns the map.
+
+    Raises ``InvalidImageError`` if the original doesn't verify or decode.
+    """
+    # Read once: verify() leaves the image unusable, so it is opened twice.
+    with field_file.open("rb") as stream:
+        data = BytesIO(stream.read())
+    try:
+        with Image.open(data) as checked:
+            checked.verify()
+        data.seek(0)
+        with Image.open(data) as original:
+            # Decoded and rotated once for every width and format.
+            image = ImageOps.exif_transpose(original)
+            jobs = [
+                (width, image_format)
+                for image_format in available_formats()
+                for width in derivative_widths(image.width)
+            ]
+            contents = [render_derivative(image, *job) for job in jobs]
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as error:
+        msg = f"{field_file.name} is not a valid image"
+        raise InvalidImageError(msg) from error
+
+    derivatives = {"source": field_file.name}
+    for (width, image_format), content in zip(jobs, contents, strict=True):
+        name = derivative_name(field_file.name, width, image_format)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        name = default_storage.save(name, ContentFile(content))
+        derivatives.setdefault(image_format, {})[str(width)] = name
+    return derivatives
+
+
+def delete_derivatives(derivatives):
+    for image_format in DERIVATIVE_FORMATS:
+        for name in (derivatives or {}).get(image_format, {}).values():
+            default_storage.delete(name)
+
+
+def derivative_srcset(name, derivatives, request=None):
+    """
+    ``{format: {width: url}}`` for the current derivatives of the image stored
+    as ``name``, or an empty map when they are missing or were made from a
+    previous upload.
+    """
+    if not name or (derivatives or {}).get("source") != name:
+        return {}
+    srcset = {}
+    for image_format in DERIVATIVE_FORMATS:
+        for width, name in derivatives.get(image_format, {}).items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            srcset.setdefault(image_format, {})[width] = url
+    return srcset
@@ -0,0 +1,345 @@
+"""
+Streaming bulk product import from CSV or NDJSON.
+
+Rows are read lazily from the file and processed in chunks: each chunk is
+validated, its categories and attributes are resolved with one query each,
+and products and attribute values are written with ``bulk_create``. Only the
+current chunk is held in memory, so file size does not affect memory use.
+Each chunk commits on its own, so the file's encoding is checked in a first
+pass before any row is imported.
+"""
+
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .attributes import update_attribute_maps
+from .caching import CATALOG_VERSION, bump_version
+from .cards import mark_stale
+from mayfair_api.utils.identifiers import ALLOCATION_ATTEMPTS
+
+from .models import (
+    Category,
+    Product,
+    ProductAttribute,
+    ProductAttributeValue,
+    allocate_product_identifiers,
+)
+from .search import update_search_vectors
+from .suggestions import is_enabled as suggestion_index_enabled
+from .suggestions import publish_change
+
+IMPORT_FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+# ProductAttributeValue.value
+MAX_ATTRIBUTE_VALUE_LENGTH = 255
+
+
+class ImportFileError(ValueError):
+    """The file as a whole can't be imported."""
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    sku = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    discount_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+    stock = serializers.IntegerField(min_value=0, required=False, default=0)
+    category = serializers.CharField(required=False, allow_blank=True)
+    short_description = serializers.CharField(required=False, allow_blank=True)
+    description = serializers.CharField(required=False, allow_blank=True)
+    is_active = serializers.BooleanField(required=False, default=True)
+    # "color:red,size:large" in CSV, or an object in NDJSON
+    attributes = serializers.JSONField(required=False)
+
+    def to_internal_value(self, data):
+        # CSV gives empty strings for missing optional columns
+        data = {key: value for key, value in data.items() if value not in ("", None)}
+        return super().to_internal_value(data)
+
+    def validate_attributes(self, value):
+        if isinstance(value, str):
+            pairs = [pair.split(":", 1) for pair in value.split(",") if ":" in pair]
+            value = {name: attribute_value for name, attribute_value in pairs}
+        if not isinstance(value, dict):
+            raise serializers.ValidationError(
+                'Expected "name:value,..." or an object of attribute values.'
+            )
+        value = {
+            str(name).strip(): str(attribute_value).strip()
+            for name, attribute_value in value.items()
+        }
+        too_long = [
+            name
+            for name, attribute_value in value.items()
+            if len(attribute_value) > MAX_ATTRIBUTE_VALUE_LENGTH
+        ]
+        if too_long:
+            raise serializers.ValidationError(
+                f"Value(s) of {', '.join(too_long)} longer than "
+                f"{MAX_ATTRIBUTE_VALUE_LENGTH} characters."
+            )
+        return value
+
+
+def detect_format(filename, content_type=""):
+    if filename.lower().endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+def check_encoding(stream):
+    """
+    Raise ``ImportFileError`` unless the seekable binary ``stream`` is UTF-8
+    throughout, then rewind it. Reads in blocks, not the whole file at once.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    offset = 0
+    try:
+        for block in iter(lambda: stream.read(64 * 1024), b""):
+            decoder.decode(block)
+            offset += len(block)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError as error:
+        position = offset + error.start
+        msg = f"The file is not UTF-8 encoded (invalid byte at offset {position})."
+        raise ImportFileError(msg) from None
+    stream.seek(0)
+
+
+def iter_rows(stream, file_format):
+    """
+    Yield raw row dicts from a seekable binary file object, one at a time.
+
+    Raises ``ImportFileError`` before the first row if the file isn't UTF-8.
+    """
+    check_encoding(stream)
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        yield from csv.DictReader(text)
+        return
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # A non-object line is reported as a row error by the importer
+        yield row if isinstance(row, dict) else {"__invalid__": line.strip()}
+
+
+class ProductImporter:
+    def __init__(self, vendor, chunk_size=DEFAULT_CHUNK_SIZE):
+        if chunk_size < 1:
+            msg = f"chunk_size must be at least 1, not {chunk_size}"
+            raise ValueError(msg)
+        self.vendor = vendor
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        row_number = 1
+        while chunk := list(islice(rows, self.chunk_size)):
+            self.import_chunk(row_number, chunk)
+            row_number += len(chunk)
+        return self.report()
+
+    def report(self):
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "errors": errors})
+
+    def import_chunk(self, first_row_number, chunk):
+        valid = []
+        for row_number, row in enumerate(chunk, start=first_row_number):
+            if "__invalid__" in row:
+                self.add_error(row_number, {"non_field_errors": ["Invalid JSON"]})
+                continue
+            serializer = ProductImportRowSerializer(data=row)
+            if serializer.is_valid():
+                valid.append((row_number, serializer.validated_data))
+            else:
+                self.add_error(row_number, serializer.errors)
+
+        categories = self.resolve_categories(valid)
+        attributes = self.resolve_attributes(valid)
+        existing_skus = set(
+            Product.objects.filter(
+                sku__in=[data["sku"] for _, data in valid if data.get("sku")]
+            ).values_list("sku", flat=True)
+        )
+
+        rows = []
+        for row_number, data in valid:
+            errors = {}
+            category = data.get("category")
+            if category and category not in categories:
+                errors["category"] = [f'Unknown category "{category}".']
+            missing = [
+                name
+                for name in data.get("attributes", {})
+                if name.casefold() not in attributes
+            ]
+            if missing:
+                errors["attributes"] = [f"Unknown attribute(s): {', '.join(missing)}."]
+            if data.get("sku") in existing_skus:
+                errors["sku"] = ["A product with this SKU already exists."]
+            if errors:
+                self.add_error(row_number, errors)
+                continue
+            if data.get("sku"):
+                existing_skus.add(data["sku"])
+
+            product = Product(
+                vendor=self.vendor,
+                category=categories.get(category),
+                name=data["name"],
+                sku=data.get("sku", ""),
+                price=data["price"],
+                discount_price=data.get("discount_price"),
+                stock=data.get("stock", 0),
+                short_description=data.get("short_description"),
+                description=data.get("description"),
+                is_active=data.get("is_active", True),
+            )
+            rows.append((row_number, product, data.get("attributes", {})))
+
+        if rows:
+            self.save(rows, attributes)
+
+    def resolve_categories(self, valid):
+        keys = {data["category"] for _, data in valid if data.get("category")}
+        if not keys:
+            return {}
+        ids = [key for key in keys if key.isdigit()]
+        slugs = [key for key in keys if not key.isdigit()]
+        categories = {}
+        for category in Category.objects.filter(id__in=ids) | Category.objects.filter(
+            slug__in=slugs
+        ):
+            categories[str(category.id)] = category
+            categories[category.slug] = category
+        return categories
+
+    def resolve_attributes(self, valid):
+        names = {
+            name for _, data in valid for name in data.get("attributes", {}) if name
+        }
+        if not names:
+            return {}
+        query = ProductAttribute.objects.none()
+        for name in names:
+            query |= ProductAttribute.objects.filter(name__iexact=name)
+        return {attribute.name.casefold(): attribute for attribute in query}
+
+    def save(self, rows, attributes):
+        """Write ``(row number, product, attribute values)`` rows."""
+        for attempt in range(ALLOCATION_ATTEMPTS):
+            if attempt:
+                rows = self.drop_taken_skus(rows)
+                if not rows:
+                    return
+            if attempt == ALLOCATION_ATTEMPTS - 1:
+                # Still colliding: save row by row so only those rows fail.
+                for row in rows:
+                    self.save_row(row, attributes)
+                return
+            generated_skus = [product for _, product, _ in rows if not product.sku]
+            try:
+                self.allocate_and_write(rows, attributes)
+                break
+            except IntegrityError:
+                # A concurrent insert took an allocated slug or SKU, or a
+                # supplied SKU
+                for _, product, _ in rows:
+                    product.pk = None
+                    product.slug = ""
+                for product in generated_skus:
+                    product.sku = ""
+        self.created += len(rows)
+
+    def save_row(self, row, attributes):
+        row_number, product, _ = row
+        supplied_sku = product.sku
+        try:
+            self.allocate_and_write([row], attributes)
+        except IntegrityError:
+            if supplied_sku and Product.objects.filter(sku=supplied_sku).exists():
+                errors = {"sku": ["A product with this SKU already exists."]}
+            else:
+                errors = {
+                    "non_field_errors": [
+                        "Could not allocate a unique slug or SKU; try again."
+                    ]
+                }
+            self.add_error(row_number, errors)
+        else:
+            self.created += 1
+
+    def drop_taken_skus(self, rows):
+        """Report rows whose supplied SKU has since been taken; returns the rest."""
+        taken = set(
+            Product.objects.filter(
+                sku__in=[product.sku for _, product, _ in rows if product.sku]
+            ).values_list("sku", flat=True)
+        )
+        remaining = []
+        for row in rows:
+            if row[1].sku in taken:
+                self.add_error(
+                    row[0], {"sku": ["A product with this SKU already exists."]}
+                )
+            else:
+                remaining.append(row)
+        return remaining
+
+    def allocate_and_write(self, rows, attributes):
+        products = [product for _, product, _ in rows]
+        allocate_product_identifiers(products)
+        with transaction.atomic():
+            self.write(products, [values for _, _, values in rows], attributes)
+
+    def write(self, products, attribute_values, attributes):
+        Product.objects.bulk_create(products)
+        ProductAttributeValue.objects.bulk_create(
+            [
+                ProductAttributeValue(
+                    product=product,
+                    attribute=attributes[name.casefold()],
+                    value=value,
+                )
+                for product, values in zip(products, attribute_values, strict=True)
+                for name, value in values.items()
+            ]
+        )
+        product_ids = [product.pk for product in products]
+        update_attribute_maps(product_ids)
+        update_search_vectors(product_ids)
+        mark_stale(product_ids)
+        # bulk_create skips the post_save invalidation; each chunk commits on
+        # its own, so each one bumps the version once it is visible.
+        transaction.on_commit(lambda: bump_version(CATALOG_VERSION))
+        if suggestion_index_enabled():
+            transaction.on_commit(
+                lambda: [publish_change("product", pk) for pk in product_ids]
+            )
@@ -0,0 +1,80 @@
+"""
+Set-based price and stock updates for a vendor's products.
+
+A batch of ``{sku, price, discount_price, stock, is_active}`` rows is applied
+with one locking read plus one ``UPDATE ... SET field = CASE sku ...`` per
+field that actually changes, instead of one save (and one set of signals)
+per product.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .caching import CATALOG_VERSION, bump_version
+from .cards import mark_stale
+from .models import Product
+from .suggestions import is_enabled as suggestion_index_enabled
+from .suggestions import publish_change
+
+BULK_UPDATE_MAX_ROWS = 500
+BULK_UPDATE_FIELDS = ("price", "discount_price", "stock", "is_active")
+
+
+def bulk_update_stock(vendor, rows):
+    """
+    Apply ``rows`` to the products of ``vendor`` and return
+    ``{"updated": [skus], "not_found": [skus]}``. Rows whose values already
+    match are left alone and not reported as updated.
+    """
+    rows = {row["sku"]: row for row in rows}
+    with transaction.atomic():
+        current = {
+            product["sku"]: product
+            for product in Product.objects.select_for_update()
+            .filter(vendor=vendor, sku__in=rows)
+            .values("id", "sku", *BULK_UPDATE_FIELDS)
+        }
+
+        changes = {field: {} for field in BULK_UPDATE_FIELDS}
+        for sku, row in rows.items():
+            product = current.get(sku)
+            if product is None:
+                continue
+            for field in BULK_UPDATE_FIELDS:
+                if field in row and row[field] != product[field]:
+                    changes[field][product["id"]] = row[field]
+
+        changed_ids = {pk for values in changes.values() for pk in values}
+        model_fields = {field: Product._meta.get_field(field) for field in changes}
+        for field, values in changes.items():
+            if not values:
+                continue
+            Product.objects.filter(pk__in=values).update(
+                **{
+                    field: Case(
+                        *[
+                            When(pk=pk, then=Value(value, model_fields[field]))
+                            for pk, value in values.items()
+                        ],
+                        default=F(field),
+                        output_field=model_fields[field],
+                    ),
+                    "updated_at": timezone.now(),
+                }
+            )
+
+        if changed_ids:
+            mark_stale(changed_ids)
+            transaction.on_commit(lambda: bump_version(CATALOG_VERSION))
+            if suggestion_index_enabled():
+                transaction.on_commit(
+                    lambda: [publish_change("product", pk) for pk in changed_ids]
+                )
+
+    return {
+        "updated": sorted(
+            sku for sku, product in current.items() if product["id"] in changed_ids
+        ),
+        "not_found": sorted(sku for sku in rows if sku not in current),
+    }
@@ -0,0 +1,348 @@
+"""
+Synthetic catalog for the product benchmark commands.
+
+Products belong to a dedicated benchmark vendor and are written through
+``ProductImporter``, so they get slugs, SKUs, attribute maps and search
+vectors exactly as imported products do. They are kept between runs: each
+command tops the vendor up to the size it needs, and deleting the vendor's
+user removes them all.
+"""
+
+import random
+from itertools import cycle, islice
+from decimal import Decimal
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from mayfair_api.accounts.models import User, VendorProfile
+from mayfair_api.orders.models import Order, OrderItem
+from mayfair_api.orders.serializers import OrderSerializer
+from mayfair_api.products.fieldsets import product_prefetch
+from mayfair_api.products.importer import ProductImporter
+from mayfair_api.products.models import Category, ProductAttribute, ProductImage
+
+BENCHMARK_EMAIL = "benchmark-vendor@example.com"
+BENCHMARK_PHONE = "+2348000000000"
+CATEGORY_NAMES = (
+    "Shoes",
+    "Running Shoes",
+    "Bags",
+    "Watches",
+    "Kitchen",
+    "Cookware",
+    "Phones",
+    "Headphones",
+    "Furniture",
+    "Lighting",
+)
+ATTRIBUTES = {
+    "color": ("red", "blue", "green", "black", "white", "grey", "navy", "tan"),
+    "size": ("xs", "s", "m", "l", "xl", "38", "40", "42", "44"),
+    "material": ("cotton", "leather", "steel", "oak", "glass", "nylon", "wool"),
+}
+# Share of products with a discount, and with each attribute.
+DISCOUNTED = 0.3
+WITH_ATTRIBUTE = 0.7
+# Shortest typed prefix that may get a typo.
+MIN_TYPO_LENGTH = 4
+ADJECTIVES = (
+    "classic",
+    "compact",
+    "deluxe",
+    "ergonomic",
+    "lightweight",
+    "modern",
+    "portable",
+    "premium",
+    "rugged",
+    "slim",
+    "vintage",
+    "waterproof",
+    "wireless",
+    "organic",
+    "handmade",
+    "foldable",
+    "insulated",
+    "padded",
+    "stainless",
+    "cordless",
+    "adjustable",
+    "breathable",
+    "reusable",
+    "magnetic",
+)
+NOUNS = (
+    "sneaker",
+    "backpack",
+    "watch",
+    "kettle",
+    "skillet",
+    "headphones",
+    "speaker",
+    "lamp",
+    "chair",
+    "desk",
+    "jacket",
+    "wallet",
+    "blender",
+    "charger",
+    "tote",
+    "boots",
+    "sandals",
+    "mug",
+    "pan",
+    "toaster",
+    "thermos",
+    "bracelet",
+    "necklace",
+    "sunglasses",
+    "umbrella",
+    "duvet",
+    "pillow",
+    "blanket",
+    "rug",
+    "mirror",
+    "vase",
+    "candle",
+    "keyboard",
+    "mouse",
+    "monitor",
+    "tripod",
+    "drone",
+    "router",
+    "earbuds",
+    "smartwatch",
+    "tablet",
+    "camera",
+    "printer",
+    "stroller",
+    "crib",
+    "scooter",
+    "helmet",
+    "bicycle",
+    "tent",
+    "hammock",
+    "cooler",
+    "grill",
+    "saucepan",
+    "wok",
+    "knife",
+    "cutlery",
+    "teapot",
+    "planter",
+    "shelf",
+    "wardrobe",
+    "stool",
+    "sofa",
+)
+# Pseudo-words for descriptions, so each one is in few products, as real
+# description vocabulary is.
+_SYLLABLES = (
+    "ka",
+    "lo",
+    "mi",
+    "ra",
+    "te",
+    "su",
+    "vo",
+    "ne",
+    "pi",
+    "da",
+    "fe",
+    "go",
+    "hu",
+    "ji",
+    "ze",
+    "ba",
+    "co",
+    "ly",
+    "ru",
+    "xi",
+)
+DESCRIPTION_WORDS = [
+    first + second + third
+    for first in _SYLLABLES
+    for second in _SYLLABLES
+    for third in ("", *_SYLLABLES)
+]
+
+
+def benchmark_vendor():
+    user, _ = User.objects.get_or_create(
+        email=BENCHMARK_EMAIL,
+        defaults={
+            "first_name": "Benchmark",
+            "last_name": "Vendor",
+            "phone_number": BENCHMARK_PHONE,
+            "user_type": "vendor",
+        },
+    )
+    vendor, _ = VendorProfile.objects.get_or_create(
+        user=user,
+        defaults={
+            "email": BENCHMARK_EMAIL,
+            "phone_number": BENCHMARK_PHONE,
+            "business_name": "Benchmark Goods",
+        },
+    )
+    return vendor
+
+
+def product_name(rng):
+    brand = "".join(
+        rng.choice("bcdfgklmnprstvz") + rng.choice("aeiou") for _ in range(2)
+    )
+    return (
+        f"{brand.title()} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} "
+        f"{rng.randrange(100, 1000)}"
+    )
+
+
+def product_rows(count, seed=0):
+    rng = random.Random(seed)
+    categories = [category.slug for category in benchmark_categories()]
+    for _ in range(count):
+        name = product_name(rng)
+        price = rng.randrange(500, 50_000) / 100
+        discounted = rng.random() < DISCOUNTED
+        yield {
+            "name": name,
+            "price": f"{price:.2f}",
+            "discount_price": f"{price * 0.8:.2f}" if discounted else None,
+            "stock": rng.randrange(0, 50),
+            "category": rng.choice(categories),
+            "short_description": f"{name.capitalize()} for everyday use.",
+            "description": " ".join(
+                rng.choices(DESCRIPTION_WORDS, k=rng.randrange(20, 60))
+            ),
+            "attributes": {
+                attribute: rng.choice(values)
+                for attribute, values in ATTRIBUTES.items()
+                if rng.random() < WITH_ATTRIBUTE
+            },
+        }
+
+
+def benchmark_categories():
+    categories = []
+    for name in CATEGORY_NAMES:
+        category = Category.objects.filter(name=name).first()
+        categories.append(category or Category.objects.create(name=name))
+    for name in ATTRIBUTES:
+        ProductAttribute.objects.get_or_create(name=name)
+    return categories
+
+
+def seed_products(count, images=0, seed=0, stdout=None):
+    """
+    Top the benchmark vendor up to ``count`` products with ``images`` image
+    rows each, returning the vendor's product queryset.
+    """
+    vendor = benchmark_vendor()
+    products = vendor.products.all()
+    missing = count - products.count()
+    if missing > 0:
+        if stdout is not None:
+            stdout.write(f"Seeding {missing} benchmark products...")
+        # A fresh seed per top-up, so new rows don't repeat the old ones.
+        report = ProductImporter(vendor, chunk_size=2000).run(
+            product_rows(missing, seed=seed + count - missing)
+        )
+        if report["failed"]:
+            msg = f"Seeding failed for {report['failed']} rows: {report['errors'][:3]}"
+            raise CommandError(msg)
+
+    if images:
+        ProductImage.objects.bulk_create(
+            [
+                ProductImage(
+                    product_id=pk,
+                    image=f"product_images/benchmark-{pk}-{index}.jpg",
+                    alt_text=f"Benchmark image {index}",
+                    is_feature=index == 0,
+                )
+                for pk in products.filter(images__isnull=True).values_list(
+                    "pk", flat=True
+                )
+                for index in range(images)
+            ],
+            batch_size=2000,
+        )
+    return products
+
+
+def serialized_orders(products, request, count, items):
+    """
+    ``count`` orders of ``items`` benchmark products each, serialized as the
+    order list renders them. The orders themselves are rolled back.
+    """
+    vendor = products.first().vendor
+    cycled = cycle(products.order_by("pk")[: count * items])
+    with transaction.atomic():
+        orders = Order.objects.bulk_create(
+            Order(
+                user=vendor.user,
+                order_number=f"BENCH{number:06d}",
+                shipping_address="1 Benchmark Road, Lagos",
+                billing_address="1 Benchmark Road, Lagos",
+                payment_method="credit_card",
+                subtotal=Decimal("100.00"),
+                tax=Decimal("7.50"),
+                shipping_cost=Decimal("5.00"),
+                total_amount=Decimal("112.50"),
+            )
+            for number in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(
+                order=order,
+                product=product,
+                quantity=2,
+                price=product.price,
+                discount=Decimal("0.00"),
+            )
+            for order in orders
+            for product in islice(cycled, items)
+        )
+        queryset = Order.objects.filter(
+            pk__in=[order.pk for order in orders]
+        ).prefetch_related(
+            "items",
+            product_prefetch("items__product", request, ("items", "product")),
+        )
+        data = OrderSerializer(queryset, many=True, context={"request": request}).data
+        transaction.set_rollback(True)
+    return data
+
+
+def sample_values(products, field, count, rng):
+    """
+    ``field`` of about ``count`` random ``products``, without ORDER BY
+    random().
+    """
+    bounds = products.aggregate(low=Min("pk"), high=Max("pk"))
+    pks = {rng.randint(bounds["low"], bounds["high"]) for _ in range(count * 2)}
+    return list(products.filter(pk__in=pks).values_list(field, flat=True)[:count])
+
+
+def typed_prefixes(names, count, rng, typo_rate=0.2):
+    """
+    Autocomplete queries: a prefix of a name as typed so far, with one
+    character dropped, doubled or swapped in ``typo_rate`` of them.
+    """
+    queries = []
+    for _ in range(count):
+        prefix = rng.choice(names)[: rng.randint(2, 12)]
+        if len(prefix) >= MIN_TYPO_LENGTH and rng.random() < typo_rate:
+            at = rng.randrange(2, len(prefix) - 1)
+            prefix = rng.choice(
+                (
+                    prefix[:at] + prefix[at + 1 :],
+                    prefix[:at] + prefix[at] + prefix[at:],
+                    prefix[:at] + prefix[at + 1] + prefix[at] + prefix[at + 2 :],
+                )
+            )
+        queries.append(prefix)
+    return queries
@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from mayfair_api.products.serializers import ProductSerializer
+from mayfair_api.products.views import ProductListView
+from mayfair_api.utils import compression
+from mayfair_api.utils.renderers import ORJSONRenderer
+
+from ._catalog import seed_products, serialized_orders
+
+# Levels to compare with the ones CompressionMiddleware uses.
+LEVELS = {
+    "zstd": (compression.ZSTD_LEVEL, (1, 3, 6, 19)),
+    "br": (compression.BROTLI_QUALITY, (1, 4, 5, 11)),
+    "gzip": (compression.GZIP_LEVEL, (1, 6, 9)),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare response size and compression time of zstd, brotli and gzip "
+        "at several levels on rendered product pages and orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-sizes", type=int, nargs="+", default=[20, 100])
+        parser.add_argument("--orders", type=int, default=20)
+        parser.add_argument("--items", type=int, default=3)
+        parser.add_argument("--rounds", type=int, default=20)
+
+    def handle(self, *args, **options):
+        products = seed_products(max(options["page_sizes"]), stdout=self.stdout)
+        request = Request(APIRequestFactory().get("/api/products/"))
+        queryset = ProductListView.queryset.filter(
+            pk__in=products.values("pk")
+        ).order_by("pk")
+        renderer = ORJSONRenderer()
+        bodies = {
+            f"products, {size}/page": renderer.render(
+                ProductSerializer(
+                    queryset[:size], many=True, context={"request": request}
+                ).data
+            )
+            for size in options["page_sizes"]
+        }
+        bodies[f"orders, {options['orders']}"] = renderer.render(
+            serialized_orders(products, request, options["orders"], options["items"])
+        )
+
+        for name, body in bodies.items():
+            self.stdout.write(f"{name}: {len(body)} B")
+            for encoding, (used, levels) in LEVELS.items():
+                for level in sorted({*levels, used}):
+                    size, seconds = self.measure(
+                        body, encoding, level, options["rounds"]
+                    )
+                    marker = "  (middleware)" if level == used else ""
+                    self.stdout.write(
+                        f"  {encoding:4} {level:2}: {size:7} B "
+                        f"({size / len(body):6.1%}) {seconds * 1000:7.3f} ms{marker}"
+                    )
+
+    def measure(self, body, encoding, level, rounds):
+        """Compressed size and median time of ``compression.compress``."""
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            compressed = compression.compress(body, encoding, level)
+            timings.append(time.perf_counter() - started)
+        return len(compressed), statistics.median(timings)
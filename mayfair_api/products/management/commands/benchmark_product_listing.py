@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from mayfair_api.products.fastpath import product_values, render_products
+from mayfair_api.products.serializers import ProductSerializer
+from mayfair_api.products.views import ProductListView
+
+from ._catalog import seed_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Time product listing pages rendered by ProductSerializer and by the "
+        "values() fast path, including their queries, on benchmark products."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--images", type=int, default=2)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--rounds", type=int, default=20)
+
+    def handle(self, *args, **options):
+        products = seed_products(
+            options["products"], images=options["images"], stdout=self.stdout
+        )
+        page_size = options["page_size"]
+        request = Request(APIRequestFactory().get("/api/products/"))
+        queryset = ProductListView.queryset.filter(
+            pk__in=products.values("pk")
+        ).order_by("-created_at", "-id")
+
+        def serializer_page(offset):
+            page = queryset[offset : offset + page_size]
+            return ProductSerializer(page, many=True, context={"request": request}).data
+
+        def fast_page(offset):
+            rows = product_values(queryset, request)[offset : offset + page_size]
+            return render_products(list(rows), request)
+
+        # Same pages for both, walking the catalog; one warm-up round first.
+        offsets = [
+            (page_size * round_number) % max(1, options["products"] - page_size)
+            for round_number in range(options["rounds"])
+        ]
+        timings = {}
+        for name, render in (("serializer", serializer_page), ("fast path", fast_page)):
+            render(0)
+            timings[name] = []
+            for offset in offsets:
+                started = time.perf_counter()
+                render(offset)
+                timings[name].append(time.perf_counter() - started)
+
+        for name, seconds in timings.items():
+            median = statistics.median(seconds)
+            self.stdout.write(
+                f"{name}: {median * 1000:.1f} ms median per {page_size}-product "
+                f"page, {page_size / median:.0f} products/s"
+            )
+        speedup = statistics.median(timings["serializer"]) / statistics.median(
+            timings["fast path"]
+        )
+        self.stdout.write(f"Fast path is {speedup:.1f}x faster")
@@ -0,0 +1,72 @@
+import time
+from itertools import pairwise
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.recommendations import (
+    READ_CHUNK_SIZE,
+    co_purchase_matrix,
+    dump_matrix,
+    load_matrix,
+    top_neighbours,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time co-purchase counting, top-K selection and matrix storage on "
+        "synthetic orders, without touching the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=10_000_000)
+        parser.add_argument("--products", type=int, default=50_000)
+        parser.add_argument("--mean-basket", type=float, default=3.0)
+        parser.add_argument("--chunk-size", type=int, default=READ_CHUNK_SIZE)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        items = options["items"]
+        # Basket sizes of 1 + Poisson, products drawn Zipf-like so a few are
+        # in most orders, as in real order history.
+        sizes = 1 + rng.poisson(options["mean_basket"] - 1, items)
+        sizes = sizes[np.cumsum(sizes) <= items]
+        order_ids = np.repeat(np.arange(len(sizes)), sizes)
+        product_ids = 1 + np.minimum(
+            rng.zipf(1.3, len(order_ids)) - 1, options["products"] - 1
+        )
+        size = options["products"] + 1
+        self.stdout.write(f"{len(order_ids)} items in {len(sizes)} orders")
+
+        # Chunks of whole orders, about --chunk-size items each, as the job reads.
+        orders_per_chunk = max(1, int(options["chunk_size"] / sizes.mean()))
+        bounds = np.searchsorted(
+            order_ids, np.arange(0, len(sizes), orders_per_chunk)
+        ).tolist()
+        bounds.append(len(order_ids))
+
+        started = time.perf_counter()
+        pairs = co_purchase_matrix(order_ids[:0], product_ids[:0], size)
+        for low, high in pairwise(bounds):
+            pairs += co_purchase_matrix(
+                order_ids[low:high], product_ids[low:high], size
+            )
+        counted = time.perf_counter()
+        self.stdout.write(
+            f"Counted {pairs.nnz} product pairs in {counted - started:.1f}s"
+        )
+
+        for pk in np.flatnonzero(np.diff(pairs.indptr)).tolist():
+            row = slice(pairs.indptr[pk], pairs.indptr[pk + 1])
+            top_neighbours(pairs.indices[row], pairs.data[row])
+        ranked = time.perf_counter()
+        self.stdout.write(f"Ranked neighbours in {ranked - counted:.1f}s")
+
+        data = dump_matrix(pairs)
+        load_matrix(data, size)
+        self.stdout.write(
+            f"Saved and loaded the {len(data) / 2**20:.0f} MB matrix in "
+            f"{time.perf_counter() - ranked:.1f}s"
+        )
@@ -0,0 +1,78 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.models import Product
+from mayfair_api.products.search import search_products
+
+from ._catalog import (
+    ADJECTIVES,
+    ATTRIBUTES,
+    DESCRIPTION_WORDS,
+    NOUNS,
+    seed_products,
+)
+
+
+def search_terms(rng, count):
+    """
+    Queries shaped like real ones: head and tail words, phrases, attribute
+    values and negations.
+    """
+    colors = ATTRIBUTES["color"]
+    shapes = (
+        lambda: rng.choice(NOUNS),
+        lambda: rng.choice(DESCRIPTION_WORDS),
+        lambda: f"{rng.choice(NOUNS)} {rng.choice(DESCRIPTION_WORDS)}",
+        lambda: f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+        lambda: f"{rng.choice(colors)} {rng.choice(NOUNS)}",
+        lambda: f'"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"',
+        lambda: f"{rng.choice(NOUNS)} -{rng.choice(colors)}",
+        lambda: f"{rng.choice(NOUNS)} or {rng.choice(NOUNS)}",
+    )
+    return [rng.choice(shapes)() for _ in range(count)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed benchmark products and report first-page latency percentiles "
+        "for ?search= queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products", type=int, default=100_000, help="e.g. 100000 or 1000000"
+        )
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("--page-size", type=int, default=24)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        seed_products(options["products"], stdout=self.stdout)
+        total = Product.objects.count()
+        page_size = options["page_size"]
+        terms = search_terms(random.Random(options["seed"]), options["queries"])
+
+        # What the fast list path reads for the first page of results.
+        def first_page(text):
+            queryset = search_products(Product.objects.filter(is_active=True), text)
+            return list(queryset.values("id", "name", "price")[:page_size])
+
+        for text in terms[:20]:
+            first_page(text)
+        seconds = []
+        for text in terms:
+            started = time.perf_counter()
+            first_page(text)
+            seconds.append(time.perf_counter() - started)
+
+        percentiles = statistics.quantiles(seconds, n=100)
+        self.stdout.write(
+            f"{len(terms)} searches over {total} products, {page_size} per page: "
+            f"p50 {percentiles[49] * 1000:.1f} ms, "
+            f"p95 {percentiles[94] * 1000:.1f} ms, "
+            f"p99 {percentiles[98] * 1000:.1f} ms, "
+            f"max {max(seconds) * 1000:.1f} ms"
+        )
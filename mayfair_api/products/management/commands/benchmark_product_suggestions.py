@@ -0,0 +1,57 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.models import Product
+from mayfair_api.products.search import suggest_products
+
+from ._catalog import sample_values, seed_products, typed_prefixes
+
+TARGET_P99_MS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed benchmark products and report latency percentiles of the "
+        "trigram-indexed database suggestions for typed, partly misspelt "
+        "prefixes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=1000)
+        parser.add_argument("--typo-rate", type=float, default=0.2)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        products = seed_products(options["products"], stdout=self.stdout)
+        rng = random.Random(options["seed"])
+        queries = typed_prefixes(
+            sample_values(products, "name", 1000, rng),
+            options["queries"],
+            rng,
+            typo_rate=options["typo_rate"],
+        )
+
+        for text in queries[:20]:
+            list(suggest_products(text))
+        seconds = []
+        for text in queries:
+            started = time.perf_counter()
+            list(suggest_products(text))
+            seconds.append(time.perf_counter() - started)
+
+        percentiles = statistics.quantiles(seconds, n=100)
+        p99 = percentiles[98] * 1000
+        self.stdout.write(
+            f"{len(queries)} suggestions over {Product.objects.count()} products: "
+            f"p50 {percentiles[49] * 1000:.1f} ms, "
+            f"p95 {percentiles[94] * 1000:.1f} ms, p99 {p99:.1f} ms, "
+            f"max {max(seconds) * 1000:.1f} ms"
+        )
+        if p99 > TARGET_P99_MS:
+            self.stdout.write(
+                self.style.WARNING(f"p99 is over the {TARGET_P99_MS} ms target")
+            )
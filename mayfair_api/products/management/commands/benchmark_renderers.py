@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from mayfair_api.products.serializers import ProductSerializer
+from mayfair_api.products.views import ProductListView
+from mayfair_api.utils.renderers import ORJSONRenderer
+
+from ._catalog import seed_products, serialized_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Time JSONRenderer and ORJSONRenderer on the same product and order "
+        "serializer output, checking that both write the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--images", type=int, default=0)
+        parser.add_argument("--orders", type=int, default=50)
+        parser.add_argument("--items", type=int, default=4)
+        parser.add_argument("--rounds", type=int, default=50)
+
+    def handle(self, *args, **options):
+        products = seed_products(
+            options["products"], images=options["images"], stdout=self.stdout
+        )
+        request = Request(APIRequestFactory().get("/api/products/"))
+        queryset = ProductListView.queryset.filter(
+            pk__in=products.values("pk")
+        ).order_by("pk")[: options["products"]]
+        payloads = {
+            f"ProductSerializer, {options['products']} products": ProductSerializer(
+                queryset, many=True, context={"request": request}
+            ).data,
+            f"OrderSerializer, {options['orders']} orders x {options['items']} items": (
+                serialized_orders(
+                    products, request, options["orders"], options["items"]
+                )
+            ),
+        }
+
+        renderers = {"JSONRenderer": JSONRenderer(), "ORJSONRenderer": ORJSONRenderer()}
+        for name, data in payloads.items():
+            bodies = {key: renderer.render(data) for key, renderer in renderers.items()}
+            if len(set(bodies.values())) > 1:
+                msg = f"{name}: the renderers wrote different bytes"
+                raise CommandError(msg)
+            medians = {}
+            for key, renderer in renderers.items():
+                seconds = []
+                for _ in range(options["rounds"]):
+                    started = time.perf_counter()
+                    renderer.render(data)
+                    seconds.append(time.perf_counter() - started)
+                medians[key] = statistics.median(seconds)
+            self.stdout.write(
+                f"{name} ({len(bodies['ORJSONRenderer']) / 1024:.0f} KB): "
+                f"{medians['JSONRenderer'] * 1000:.2f} ms -> "
+                f"{medians['ORJSONRenderer'] * 1000:.2f} ms "
+                f"({medians['JSONRenderer'] / medians['ORJSONRenderer']:.1f}x)"
+            )
@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mayfair_api.products.suggestions import (
+    MAX_FEED_BACKLOG,
+    POLL_INTERVAL,
+    SuggestionIndex,
+    publish_change,
+)
+
+from ._catalog import sample_values, seed_products, typed_prefixes
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed benchmark products, then report the in-process suggestion "
+        "index's build time, memory, lookup latency and change replay cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=10_000)
+        parser.add_argument("--changes", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options["changes"] > MAX_FEED_BACKLOG:
+            msg = f"--changes can't be over {MAX_FEED_BACKLOG}, the feed backlog"
+            raise CommandError(msg)
+        products = seed_products(options["products"], stdout=self.stdout)
+        rng = random.Random(options["seed"])
+
+        index = SuggestionIndex()
+        started = time.perf_counter()
+        index.rebuild(background=False)
+        if not index.ready:
+            msg = "The index build failed; see the log"
+            raise CommandError(msg)
+        self.stdout.write(
+            f"Built the index of {len(index.snapshot.product_slots)} products "
+            f"({len(index.snapshot.products.offsets)} word keys) in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+        # Traced separately, as tracing slows the build down.
+        tracemalloc.start()
+        traced = SuggestionIndex()
+        traced.rebuild(background=False)
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del traced
+        self.stdout.write(
+            f"Index memory: {size / 2**20:.0f} MB held, "
+            f"{peak / 2**20:.0f} MB peak while building"
+        )
+
+        queries = typed_prefixes(
+            sample_values(products, "name", 1000, rng),
+            options["queries"],
+            rng,
+            typo_rate=0,
+        )
+        self.report_latency("Lookups", index, queries)
+
+        # Replayed through the feed, as a worker sees other workers' writes.
+        for pk in sample_values(products, "pk", options["changes"], rng):
+            publish_change("product", pk)
+        time.sleep(POLL_INTERVAL)
+        started = time.perf_counter()
+        index.search(queries[0])
+        if not index.ready:
+            msg = (
+                "The index gave up replaying the feed; the cache evicted some "
+                "of its entries"
+            )
+            raise CommandError(msg)
+        self.stdout.write(
+            f"Replayed {options['changes']} changes in "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        self.report_latency(
+            f"Lookups with {index.snapshot.products.changes} pending changes",
+            index,
+            queries,
+        )
+
+    def report_latency(self, label, index, queries):
+        seconds = []
+        for text in queries:
+            started = time.perf_counter()
+            index.search(text)
+            seconds.append(time.perf_counter() - started)
+        percentiles = statistics.quantiles(seconds, n=100)
+        self.stdout.write(
+            f"{label}: p50 {percentiles[49] * 1e6:.0f} µs, "
+            f"p95 {percentiles[94] * 1e6:.0f} µs, "
+            f"p99 {percentiles[98] * 1e6:.0f} µs, max {max(seconds) * 1e6:.0f} µs"
+        )
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from mayfair_api.products.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    export_chunks,
+    export_queryset,
+)
+
+
+class Command(BaseCommand):
+    help = "Export active products as NDJSON or CSV, streaming chunk by chunk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", help="File to write to (defaults to standard output)"
+        )
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument(
+            "--updated-since", help="Only products updated at or after this time"
+        )
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options["updated_since"]:
+            updated_since = parse_datetime(options["updated_since"])
+            if updated_since is None:
+                msg = f"Invalid --updated-since value: {options['updated_since']}"
+                raise CommandError(msg)
+
+        chunks = export_chunks(
+            export_queryset(updated_since),
+            options["format"],
+            chunk_size=options["chunk_size"],
+        )
+        if not options["output"]:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        with open(options["output"], "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.popularity import flush_buckets
+
+
+class Command(BaseCommand):
+    help = "Fold buffered view, cart and purchase counts into product popularity."
+
+    def handle(self, *args, **options):
+        updated = flush_buckets()
+        self.stdout.write(f"Updated popularity of {updated} products")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.tasks import IMAGE_MODELS, generate_image_derivatives
+
+
+class Command(BaseCommand):
+    help = "Queue resized derivatives for product and category images missing them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--inline", action="store_true", help="Render here instead of in Celery"
+        )
+
+    def handle(self, *args, **options):
+        for kind, model in IMAGE_MODELS.items():
+            queued = 0
+            pks = (
+                model.objects.exclude(image="")
+                .exclude(image__isnull=True)
+                .values_list("pk", flat=True)
+                .iterator()
+            )
+            for pk in pks:
+                # The task skips images whose derivatives are current.
+                if options["inline"]:
+                    generate_image_derivatives(kind, pk)
+                else:
+                    generate_image_derivatives.delay(kind, pk)
+                queued += 1
+            self.stdout.write(f"{kind}: {queued} images")
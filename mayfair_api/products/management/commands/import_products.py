@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mayfair_api.accounts.models import VendorProfile
+from mayfair_api.products.importer import (
+    DEFAULT_CHUNK_SIZE,
+    IMPORT_FORMATS,
+    ImportFileError,
+    ProductImporter,
+    detect_format,
+    iter_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Import products for a vendor from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--vendor", type=int, required=True, help="Vendor id")
+        parser.add_argument("--format", choices=IMPORT_FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            vendor = VendorProfile.objects.get(pk=options["vendor"])
+        except VendorProfile.DoesNotExist:
+            raise CommandError(f"Vendor {options['vendor']} does not exist") from None
+
+        if options["chunk_size"] < 1:
+            msg = "--chunk-size must be at least 1"
+            raise CommandError(msg)
+
+        file_format = options["format"] or detect_format(options["path"])
+        importer = ProductImporter(vendor, chunk_size=options["chunk_size"])
+        with open(options["path"], "rb") as stream:
+            try:
+                report = importer.run(iter_rows(stream, file_format))
+            except ImportFileError as error:
+                raise CommandError(error) from None
+
+        for error in report["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            f"Imported {report['created']} products, {report['failed']} rows failed"
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.categories import rebuild_category_paths
+
+
+class Command(BaseCommand):
+    help = "Recompute category paths from parent links, e.g. after loaddata."
+
+    def handle(self, *args, **options):
+        changed = rebuild_category_paths()
+        self.stdout.write(f"Rebuilt the path of {changed} categories")
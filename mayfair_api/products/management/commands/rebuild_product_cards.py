@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.cards import REBUILD_CHUNK_SIZE, rebuild_cards
+from mayfair_api.products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Re-render the stored listing card of every product (or only stale ones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            help="Only products whose card is missing or marked stale",
+        )
+        parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        products = Product.objects.order_by("pk")
+        if options["stale"]:
+            products = products.exclude(card__stale_since__isnull=True)
+        product_ids = products.values_list("pk", flat=True).iterator(
+            chunk_size=options["chunk_size"]
+        )
+
+        rebuilt = 0
+        chunk = []
+        for pk in product_ids:
+            chunk.append(pk)
+            if len(chunk) == options["chunk_size"]:
+                rebuilt += rebuild_cards(chunk)
+                chunk = []
+        if chunk:
+            rebuilt += rebuild_cards(chunk)
+        self.stdout.write(f"Rebuilt {rebuilt} product cards")
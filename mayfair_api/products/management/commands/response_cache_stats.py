@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.caching import response_cache_stats
+
+CACHED_VIEWS = [
+    "ProductListView",
+    "CategoryListView",
+    "ProductAttributeListView",
+    "PaymentMethodListView",
+]
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counts for the versioned API response cache."
+
+    def handle(self, *args, **options):
+        for name, counts in response_cache_stats(CACHED_VIEWS).items():
+            total = counts["hit"] + counts["miss"]
+            ratio = counts["hit"] / total if total else 0
+            self.stdout.write(
+                f"{name}: {counts['hit']} hits, {counts['miss']} misses "
+                f"({ratio:.1%} hit rate)"
+            )
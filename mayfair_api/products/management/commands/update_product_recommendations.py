@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mayfair_api.products.recommendations import (
+    READ_CHUNK_SIZE,
+    WRITE_CHUNK_SIZE,
+    reset_recommendations,
+    update_recommendations,
+)
+
+
+class Command(BaseCommand):
+    help = 'Count new orders into the "frequently bought together" lists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Forget what was counted and count every order again",
+        )
+        parser.add_argument("--read-chunk-size", type=int, default=READ_CHUNK_SIZE)
+        parser.add_argument("--write-chunk-size", type=int, default=WRITE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["rebuild"]:
+            reset_recommendations()
+        updated = update_recommendations(
+            options["read_chunk_size"], options["write_chunk_size"]
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Updated recommendations of {updated} products in {elapsed:.1f}s"
+        )
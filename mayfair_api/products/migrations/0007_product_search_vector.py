@@ -0,0 +1,34 @@
+# Generated by Django 5.1.8 on 2026-10-18 06:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from mayfair_api.products.search import build_search_vector
+
+
+def populate_search_vector(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductAttributeValue = apps.get_model("products", "ProductAttributeValue")
+    Product.objects.update(search_vector=build_search_vector(ProductAttributeValue))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_rename_business_description_vendorprofile_description_and_more'),
+        ('products', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.8 on 2026-10-18 06:28
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+from mayfair_api.products.attributes import build_attribute_maps
+
+
+def populate_attribute_map(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductAttributeValue = apps.get_model("products", "ProductAttributeValue")
+    maps = build_attribute_maps(
+        ProductAttributeValue.objects.values_list(
+            "product_id", "attribute__name", "value"
+        ).iterator()
+    )
+    Product.objects.bulk_update(
+        [Product(pk=pk, attribute_map=value) for pk, value in maps.items()],
+        ["attribute_map"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_rename_business_description_vendorprofile_description_and_more'),
+        ('products', '0008_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='attribute_map',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attribute_map'], name='product_attribute_map_idx', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.RunPython(populate_attribute_map, migrations.RunPython.noop),
+    ]
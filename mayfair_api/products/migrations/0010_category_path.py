@@ -0,0 +1,41 @@
+# Generated by Django 5.1.8 on 2026-10-18 06:29
+
+from django.db import migrations, models
+
+
+def populate_path(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    paths = {}
+
+    def path_for(pk):
+        if pk not in paths:
+            parent_id = parents[pk]
+            paths[pk] = f"{path_for(parent_id) if parent_id else ''}{pk}/"
+        return paths[pk]
+
+    Category.objects.bulk_update(
+        [Category(pk=pk, path=path_for(pk)) for pk in parents],
+        ["path"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_attribute_map'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(populate_path, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.8 on 2026-10-18 06:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='products.product')),
+                ('body', models.TextField()),
+                ('rendered_at', models.DateTimeField()),
+                ('stale_since', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
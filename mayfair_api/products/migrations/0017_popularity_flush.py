@@ -0,0 +1,21 @@
+# Generated by Django 5.1.8 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_remove_product_price_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_bucket', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
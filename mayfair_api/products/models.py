@@ -1,12 +1,16 @@
-import uuid
-import random
-import string
-
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, JSONObject, Substr
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator
 
 from mayfair_api.accounts.models import VendorProfile
+from mayfair_api.utils.identifiers import ALLOCATION_ATTEMPTS, allocate_unique
 
 
 class Category(models.Model):
@@ -14,14 +18,31 @@ class Category(models.Model):
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     image = models.FileField(upload_to="category_images/", blank=True, null=True)
+    # Resized copies of `image`; see products.images
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     parent = models.ForeignKey(
         "self", on_delete=models.CASCADE, null=True, blank=True, related_name="children"
     )
+    # Materialized path of ancestor ids, e.g. "1/5/" for 5 under 1
+    path = models.CharField(max_length=255, blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "categories"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="category_created_id_idx"),
+            models.Index(
+                fields=["path"],
+                name="category_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            GinIndex(
+                fields=["name"],
+                name="category_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -31,7 +52,32 @@ class Category(models.Model):
         if not self.slug and self.name:
             base_slug = slugify(self.name)
             self.slug = base_slug
+        parent_path = self.parent.path if self.parent_id else ""
+        if self.path and parent_path.startswith(self.path):
+            raise ValueError("A category cannot be moved under its own subtree")
         super().save(*args, **kwargs)
+        self.update_path(parent_path)
+
+    def update_path(self, parent_path):
+        path = f"{parent_path}{self.pk}/"
+        if path == self.path:
+            return
+        if self.path:
+            # Re-root every descendant onto the new path in one UPDATE
+            Category.objects.filter(path__startswith=self.path).exclude(
+                pk=self.pk
+            ).update(path=Concat(Value(path), Substr("path", len(self.path) + 1)))
+        Category.objects.filter(pk=self.pk).update(path=path)
+        self.path = path
+
+    def get_descendants(self, include_self=True):
+        if not self.path:
+            # Created without save() (bulk_create, loaddata) and not yet
+            # repaired by rebuild_category_paths: only itself is known.
+            queryset = Category.objects.filter(pk=self.pk)
+            return queryset if include_self else queryset.none()
+        queryset = Category.objects.filter(path__startswith=self.path)
+        return queryset if include_self else queryset.exclude(pk=self.pk)
 
 
 class Product(models.Model):
@@ -55,38 +101,83 @@ class Product(models.Model):
         null=True,
         validators=[MinValueValidator(0)],
     )
+    # The price actually charged; stored and kept current by Postgres, so
+    # saves, bulk writes and queryset updates can't leave it stale.
+    effective_price = models.GeneratedField(
+        expression=Coalesce("discount_price", "price"),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     stock = models.PositiveIntegerField(default=0)
     sku = models.CharField(max_length=50, unique=True)
     is_active = models.BooleanField(default=True)
+    # Maintained by products.search.update_search_vectors
+    search_vector = SearchVectorField(null=True, editable=False)
+    # {attribute name: [values]}, lower-cased; maintained by
+    # products.attributes.update_attribute_maps
+    attribute_map = models.JSONField(default=dict, blank=True, editable=False)
+    # log2 of decayed view/cart/purchase counts; maintained by
+    # products.popularity.flush_buckets
+    popularity = models.FloatField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Keyset pagination seeks on (ordering field, id) for each sort option.
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="product_created_id_idx"),
+            models.Index(fields=["updated_at", "id"], name="product_updated_id_idx"),
+            models.Index(
+                fields=["discount_price", "id"], name="product_discount_id_idx"
+            ),
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+            # Listings are always filtered on is_active; these serve price
+            # ranges and price ordering, overall and within categories.
+            models.Index(
+                fields=["is_active", "effective_price", "id"],
+                name="product_active_eff_price_idx",
+            ),
+            models.Index(
+                fields=["is_active", "category", "effective_price"],
+                name="product_active_cat_price_idx",
+            ),
+            models.Index(
+                fields=["is_active", "popularity", "id"],
+                name="product_active_popularity_idx",
+            ),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            GinIndex(
+                fields=["name"],
+                name="product_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["attribute_map"],
+                name="product_attribute_map_idx",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        # Only generate slug if it doesn't exist
-        if not self.slug and self.name:
-            self.slug = self.generate_unique_slug()
-
-        # Auto-generate SKU if empty
-        if not self.sku:
-            self.sku = f"PROD-{uuid.uuid4().hex[:6]}"
-
-        super().save(*args, **kwargs)
-
-    def generate_unique_slug(self):
-        base_slug = slugify(self.name)
-        new_slug = base_slug
-
-        # Only add randomness if slug exists
-        if Product.objects.filter(slug=new_slug).exists():
-            random_suffix = "".join(
-                random.choices(string.ascii_lowercase + string.digits, k=4)
-            )
-            new_slug = f"{base_slug}-{random_suffix}"
+        # Slug and SKU are only generated when missing
+        generated = [field for field in ("slug", "sku") if not getattr(self, field)]
+        if not generated:
+            return super().save(*args, **kwargs)
 
-        return new_slug
+        for attempt in range(ALLOCATION_ATTEMPTS):
+            allocate_product_identifiers([self])
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Another insert took the value between allocation and save
+                if attempt == ALLOCATION_ATTEMPTS - 1:
+                    raise
+                for field in generated:
+                    setattr(self, field, "")
 
 
 class ProductImage(models.Model):
@@ -94,6 +185,8 @@ class ProductImage(models.Model):
         Product, on_delete=models.CASCADE, related_name="images"
     )
     image = models.ImageField(upload_to="product_images/")
+    # Resized copies of `image`; see products.images
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=255, blank=True)
     is_feature = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -119,3 +212,130 @@ class ProductAttributeValue(models.Model):
 
     def __str__(self):
         return f"{self.attribute.name}: {self.value}"
+
+
+class ProductCard(models.Model):
+    """
+    A product's listing representation, pre-encoded as JSON; maintained by
+    products.cards.
+    """
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="card"
+    )
+    body = models.TextField()
+    rendered_at = models.DateTimeField()
+    # When a change to the product was first seen after the last render
+    stale_since = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Card for product {self.product_id}"
+
+
+class ProductRecommendation(models.Model):
+    """
+    The products most often bought together with a product, best first;
+    maintained by products.recommendations.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="recommendation",
+    )
+    product_ids = ArrayField(models.BigIntegerField())
+    # Orders shared with each of product_ids
+    orders = ArrayField(models.PositiveIntegerField())
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Recommendations for product {self.product_id}"
+
+
+class CoPurchaseMatrix(models.Model):
+    """
+    How many orders, up to ``last_order_id``, contained each pair of
+    products: a SciPy sparse matrix indexed by product id, as written by
+    ``scipy.sparse.save_npz``. One row, maintained by
+    products.recommendations.
+    """
+
+    last_order_id = models.BigIntegerField(default=0)
+    matrix = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Co-purchases up to order {self.last_order_id}"
+
+
+class PopularityFlush(models.Model):
+    """
+    The newest popularity bucket folded into ``Product.popularity``, written
+    in the same transaction as the scores. One row, maintained by
+    products.popularity.
+    """
+
+    last_bucket = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Popularity up to bucket {self.last_bucket}"
+
+
+def touch_products(product_ids):
+    """
+    Move ``updated_at`` of products whose images or attribute values changed,
+    which incremental exports select on.
+    """
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+def allocate_product_identifiers(products):
+    """
+    Fill in missing slugs and SKUs for a batch of unsaved products, checking
+    the whole batch for collisions in one query per attempt.
+    """
+    missing_slug = [product for product in products if not product.slug]
+    missing_sku = [product for product in products if not product.sku]
+    values = allocate_unique(
+        Product,
+        {
+            "slug": [slugify(product.name) for product in missing_slug],
+            "sku": ["PROD"] * len(missing_sku),
+        },
+        bare=("slug",),
+    )
+    for product, slug in zip(missing_slug, values["slug"], strict=True):
+        product.slug = slug
+    for product, sku in zip(missing_sku, values["sku"], strict=True):
+        product.sku = sku
+
+
+def attribute_values_array():
+    """
+    A product's attribute values as ``[{"attribute": name, "value": value}]``,
+    for annotating onto Product querysets instead of prefetching.
+    """
+    return ArraySubquery(
+        ProductAttributeValue.objects.filter(product=OuterRef("pk"))
+        .order_by("id")
+        .values(data=JSONObject(attribute="attribute__name", value="value"))
+    )
+
+
+def feature_image_data():
+    """
+    A product's feature image (or first image) as
+    ``{"image": name, "image_derivatives": {...}}``, for annotating listings
+    that show a single image instead of prefetching every image.
+    """
+    return Subquery(
+        ProductImage.objects.filter(product=OuterRef("pk"))
+        .order_by("-is_feature", "id")
+        .values(
+            data=JSONObject(image="image", image_derivatives="image_derivatives")
+        )[:1],
+        output_field=models.JSONField(),
+    )
@@ -0,0 +1,237 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, GeneratedField, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _get(instance, name):
+    # Rows may be model instances or dicts from a values() queryset.
+    if isinstance(instance, dict):
+        return instance[name]
+    return getattr(instance, name)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (seek) pagination with opaque cursors.
+
+    Pages are only produced when the client sends ``cursor`` or ``page_size``,
+    so existing clients keep getting the full list. Rows are ordered by one
+    sort field plus ``id`` as a tie-breaker and each page seeks past the last
+    row it returned, so deep pages cost the same as the first one and no
+    ``COUNT(*)`` is ever issued.
+
+    Without an ``ordering`` choice, a queryset ordered by an annotation
+    (ranked search results, by ``search_rank``) keeps that order and seeks
+    on the annotation.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering_query_param = "ordering"
+    page_size = 24
+    max_page_size = 100
+    default_ordering = "-created_at"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            self.cursor_query_param not in request.query_params
+            and self.page_size_query_param not in request.query_params
+        ):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, view, queryset)
+        if self.field in queryset.query.annotations:
+            self.model_field = queryset.query.annotations[self.field].output_field
+        else:
+            self.model_field = queryset.model._meta.get_field(self.field)
+        if isinstance(self.model_field, GeneratedField):
+            # Its own to_python() passes anything through; cursors need the type.
+            self.model_field = self.model_field.output_field
+        self.nullable = self.model_field.null
+
+        cursor = self.decode_cursor(request)
+        forward = cursor is None or cursor["d"] == "n"
+        queryset = queryset.order_by(*self.get_order_by(forward))
+        if cursor is not None:
+            queryset = queryset.filter(self.get_seek_filter(cursor, forward))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if not forward:
+            results.reverse()
+
+        self.has_next = has_more if forward else True
+        self.has_previous = cursor is not None if forward else has_more
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque pagination cursor from a previous page.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results per page (enables pagination).",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering_fields(self, view):
+        # Honour the same ordering choices the view's filterset exposes.
+        filterset_class = getattr(view, "filterset_class", None)
+        if filterset_class is not None:
+            ordering_filter = filterset_class.base_filters.get(
+                self.ordering_query_param
+            )
+            if ordering_filter is not None:
+                return ordering_filter.param_map
+        return {"created_at": "created_at"}
+
+    def get_annotation_ordering(self, queryset):
+        # A ranking the queryset already applies, such as -search_rank
+        order_by = queryset.query.order_by
+        if not order_by or not isinstance(order_by[0], str):
+            return None
+        name = order_by[0].lstrip("-")
+        if name not in queryset.query.annotations:
+            return None
+        return name, order_by[0].startswith("-")
+
+    def get_ordering(self, request, view, queryset):
+        fields = self.get_ordering_fields(view)
+        # Only the first ordering term drives the keyset; `id` breaks ties.
+        term = request.query_params.get(self.ordering_query_param, "")
+        term = term.split(",")[0].strip()
+        if term.lstrip("-") not in fields:
+            ranked = self.get_annotation_ordering(queryset)
+            if ranked is not None:
+                return ranked
+            term = self.default_ordering
+        return fields.get(term.lstrip("-"), term.lstrip("-")), term.startswith("-")
+
+    def get_order_by(self, forward):
+        # NULLs sort last when walking forwards, so first when walking back.
+        descending = self.descending == forward
+        expression = F(self.field).desc if descending else F(self.field).asc
+        tie_breaker = "-id" if descending else "id"
+        if not self.nullable:
+            return [expression(), tie_breaker]
+        if forward:
+            return [expression(nulls_last=True), tie_breaker]
+        return [expression(nulls_first=True), tie_breaker]
+
+    def get_seek_filter(self, cursor, forward):
+        value, pk = cursor["v"], cursor["id"]
+        lookup = "gt" if self.descending != forward else "lt"
+        after_pk = Q(**{f"id__{lookup}": pk})
+
+        if value is None:
+            if forward:
+                return Q(**{f"{self.field}__isnull": True}) & after_pk
+            return Q(**{f"{self.field}__isnull": False}) | (
+                Q(**{f"{self.field}__isnull": True}) & after_pk
+            )
+
+        seek = Q(**{f"{self.field}__{lookup}": value}) | (
+            Q(**{self.field: value}) & after_pk
+        )
+        if forward and self.nullable:
+            seek |= Q(**{f"{self.field}__isnull": True})
+        return seek
+
+    @property
+    def ordering_key(self):
+        return f"-{self.field}" if self.descending else self.field
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], "n")
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], "p")
+
+    def encode_cursor(self, instance, direction):
+        position = {
+            "o": self.ordering_key,
+            "v": _get(instance, self.field),
+            "id": _get(instance, "id"),
+            "d": direction,
+        }
+        # Full-precision strings so the seek compares against the exact value.
+        token = json.dumps(position, default=_encode_value, separators=(",", ":"))
+        encoded = urlsafe_b64encode(token.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            if position["o"] != self.ordering_key or position["d"] not in ("n", "p"):
+                raise ValueError
+            if position["v"] is not None:
+                position["v"] = self.model_field.to_python(position["v"])
+            position["id"] = int(position["id"])
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message) from None
+        return position
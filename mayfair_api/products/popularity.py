@@ -0,0 +1,203 @@
+"""
+Product popularity from views, add-to-cart and purchases.
+
+Events are counted in Redis rather than on the product rows, so busy
+products don't serialise requests on a row lock: each one is a ``HINCRBY``
+on the hash for the current ``BUCKET_SECONDS`` interval, with a
+``<product id>:<event>`` field. Recording is best effort; if Redis is
+unavailable the event is dropped and the request carries on.
+
+``flush_buckets`` (run by the ``flush_product_popularity`` beat task) folds
+closed buckets into ``Product.popularity`` in bulk. Each bucket is renamed
+to a ``flushing:`` key before it is read, and the scores are committed
+together with the bucket's number in ``PopularityFlush``, so a flush that
+dies before deleting the key skips it next time instead of counting it
+twice. The score uses forward
+decay: an event at time ``t`` weighs ``2 ** ((t - EPOCH) / HALF_LIFE)``
+times its ``EVENT_WEIGHTS`` entry, so newer events count for more and only
+products with new events need their score rewritten; comparing any two
+scores gives the same answer as decaying both to the present. The column
+holds the base-2 logarithm of the weighted sum to keep it in float range,
+and 0 for products with no recorded events.
+
+Flushes leave the catalog version alone and bump ``POPULARITY_VERSION``
+instead, which only responses ordered by popularity depend on.
+"""
+
+import logging
+import math
+import ssl
+import time
+from datetime import UTC, datetime, timedelta
+
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from .caching import bump_version
+from .models import PopularityFlush, Product
+
+logger = logging.getLogger(__name__)
+
+VIEW = "view"
+CART = "cart"
+PURCHASE = "purchase"
+EVENT_WEIGHTS = {VIEW: 1, CART: 5, PURCHASE: 20}
+
+BUCKET_SECONDS = 5 * 60
+# Buckets older than this are dropped by Redis if never flushed.
+BUCKET_TTL = 7 * 24 * 60 * 60
+KEY_PREFIX = "products:popularity:"
+FLUSHING_PREFIX = f"{KEY_PREFIX}flushing:"
+FLUSH_LOCK_KEY = "products:popularity-flush"
+FLUSH_CHUNK_SIZE = 500
+# Bumped by each flush that changes scores; responses ordered by popularity
+# are cached under it as well as the catalog version.
+POPULARITY_VERSION = "popularity"
+
+EPOCH = datetime(2025, 1, 1, tzinfo=UTC)
+HALF_LIFE = timedelta(days=7)
+
+_client = None
+
+
+def get_client():
+    global _client  # noqa: PLW0603
+    if _client is None:
+        options = {"socket_timeout": 0.5, "socket_connect_timeout": 0.5}
+        if settings.REDIS_SSL:
+            options["ssl_cert_reqs"] = ssl.CERT_NONE
+        _client = redis.Redis.from_url(settings.REDIS_URL, **options)
+    return _client
+
+
+def bucket_key(bucket):
+    return f"{KEY_PREFIX}{bucket}"
+
+
+def flushing_key(bucket):
+    return f"{FLUSHING_PREFIX}{bucket}"
+
+
+def current_bucket():
+    return int(time.time()) // BUCKET_SECONDS
+
+
+def record(event, product_ids):
+    """Count ``event`` once for each of ``product_ids``."""
+    key = bucket_key(current_bucket())
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        for product_id in product_ids:
+            pipe.hincrby(key, f"{product_id}:{event}", 1)
+        pipe.expire(key, BUCKET_TTL)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Could not record product %s events: %s", event, exc)
+
+
+def record_on_commit(event, product_ids):
+    """``record`` once the current transaction commits."""
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: record(event, product_ids))
+
+
+def bucket_exponent(bucket):
+    """log2 of the forward-decay weight of events in ``bucket``."""
+    seconds = bucket * BUCKET_SECONDS - EPOCH.timestamp()
+    return seconds / HALF_LIFE.total_seconds()
+
+
+def add_log2(a, b):
+    """``log2(2 ** a + 2 ** b)`` without overflowing."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def bucket_scores(bucket, counts):
+    """``{product id: log2 weight}`` for one bucket's ``HGETALL`` result."""
+    weights = {}
+    for field, count in counts.items():
+        product_id, _, event = field.decode().partition(":")
+        weight = EVENT_WEIGHTS.get(event)
+        if weight is None or not product_id.isdigit():
+            continue
+        product_id = int(product_id)
+        weights[product_id] = weights.get(product_id, 0) + weight * int(count)
+    exponent = bucket_exponent(bucket)
+    return {
+        pk: math.log2(weight) + exponent for pk, weight in weights.items() if weight
+    }
+
+
+@transaction.atomic
+def apply_scores(scores):
+    """Fold ``{product id: log2 weight}`` into the stored popularity."""
+    products = list(
+        Product.objects.select_for_update()
+        .filter(pk__in=scores)
+        .only("pk", "popularity")
+        .order_by("pk")
+    )
+    for product in products:
+        score = scores[product.pk]
+        if product.popularity:
+            score = add_log2(product.popularity, score)
+        product.popularity = score
+    # bulk_update leaves updated_at and the catalog version alone; only
+    # responses ordered by popularity are invalidated, by flush_buckets.
+    Product.objects.bulk_update(products, ["popularity"], batch_size=FLUSH_CHUNK_SIZE)
+    return len(products)
+
+
+def closed_buckets(client):
+    # Leave the previous bucket open too, for requests still finishing it.
+    newest = current_bucket() - 2
+    buckets = set()
+    for key in client.scan_iter(match=f"{KEY_PREFIX}*"):
+        # Includes buckets an interrupted flush left under a flushing: key.
+        suffix = key.decode().removeprefix(FLUSHING_PREFIX).removeprefix(KEY_PREFIX)
+        if suffix.isdigit() and int(suffix) <= newest:
+            buckets.add(int(suffix))
+    return sorted(buckets)
+
+
+def flush_bucket(client, bucket):
+    """
+    Fold one closed bucket into the scores unless an earlier flush already
+    committed it, then delete it. Returns how many product scores changed.
+    """
+    key = flushing_key(bucket)
+    # RENAME is atomic, so events can't land between the read and the delete.
+    if not client.exists(key):
+        try:
+            client.rename(bucket_key(bucket), key)
+        except redis.ResponseError:
+            # Gone since the scan (expired)
+            return 0
+
+    updated = 0
+    with transaction.atomic():
+        state = PopularityFlush.objects.select_for_update().filter(pk=1).first()
+        if state is None:
+            state = PopularityFlush(pk=1)
+        if bucket > state.last_bucket:
+            updated = apply_scores(bucket_scores(bucket, client.hgetall(key)))
+            state.last_bucket = bucket
+            state.save()
+    client.delete(key)
+    return updated
+
+
+def flush_buckets():
+    """
+    Fold every closed bucket into ``Product.popularity``, oldest first.
+    Returns how many product scores changed.
+    """
+    client = get_client()
+    with client.lock(FLUSH_LOCK_KEY, timeout=settings.CELERY_TASK_TIME_LIMIT):
+        updated = sum(flush_bucket(client, bucket) for bucket in closed_buckets(client))
+    if updated:
+        bump_version(POPULARITY_VERSION)
+    return updated
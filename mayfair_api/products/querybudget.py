@@ -0,0 +1,49 @@
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceededError(AssertionError):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMixin:
+    """
+    Hold safe (GET/HEAD) requests to ``query_budget`` database queries.
+
+    Overruns are logged as warnings, and raise when the
+    ``QUERY_BUDGET_STRICT`` setting is on (as it is under the test settings)
+    so regressions fail the suite instead of surfacing in production.
+    """
+
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None or request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+
+        if counter.count > self.query_budget:
+            message = (
+                f"{type(self).__name__} ran {counter.count} queries for "
+                f"{request.get_full_path()} (budget {self.query_budget})"
+            )
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceededError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,188 @@
+"""
+"Frequently bought together" recommendations from order history.
+
+``update_recommendations`` (run by the ``update_product_recommendations``
+beat task) reads the items of orders placed since its last run, in order id
+order. Each chunk of whole orders becomes a sparse order x product incidence
+matrix ``B``, and ``B.T @ B`` counts how many of those orders held each pair
+of products. The counts are added to the stored CoPurchaseMatrix, and each
+product whose counts changed gets its ``TOP_K`` neighbours rewritten in
+ProductRecommendation, the only table the recommendation endpoint reads.
+Counts, progress and recommendations are saved in one transaction, so a
+failed run is simply repeated.
+
+Each run stops before the first order younger than ``SETTLE_TIME``, so one
+still being written by a slow request isn't passed over. Orders are counted
+whatever their later status.
+"""
+
+import io
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from scipy import sparse
+
+from mayfair_api.orders.models import Order, OrderItem
+
+from .models import CoPurchaseMatrix, Product, ProductRecommendation
+
+TOP_K = 20
+SETTLE_TIME = timedelta(minutes=10)
+# Order items per incidence matrix, and recommendations per INSERT.
+READ_CHUNK_SIZE = 200_000
+WRITE_CHUNK_SIZE = 1000
+
+
+def iter_item_chunks(order_items, chunk_size=READ_CHUNK_SIZE):
+    """
+    ``(order ids, product ids)`` arrays of about ``chunk_size`` items each,
+    read in order id order and never splitting an order.
+    """
+    rows = (
+        order_items.order_by("order_id")
+        .values_list("order_id", "product_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    order_ids, product_ids = [], []
+    for order_id, product_id in rows:
+        if len(order_ids) >= chunk_size and order_id != order_ids[-1]:
+            yield np.array(order_ids), np.array(product_ids)
+            order_ids, product_ids = [], []
+        order_ids.append(order_id)
+        product_ids.append(product_id)
+    if order_ids:
+        yield np.array(order_ids), np.array(product_ids)
+
+
+def co_purchase_matrix(order_ids, product_ids, size):
+    """
+    Sparse ``size`` x ``size`` matrix of how many of the given orders hold
+    each pair of products, indexed by product id.
+    """
+    orders, rows = np.unique(order_ids, return_inverse=True)
+    baskets = sparse.csr_array(
+        (np.ones(len(rows), dtype=np.int32), (rows, product_ids)),
+        shape=(len(orders), size),
+    )
+    # A product on two lines of one order is still one order.
+    baskets.data[:] = 1
+    pairs = (baskets.T @ baskets).tocsr()
+    pairs.setdiag(0)
+    pairs.eliminate_zeros()
+    return pairs
+
+
+def load_matrix(data, size):
+    """A stored matrix, grown to at least ``size`` x ``size``."""
+    if not data:
+        return sparse.csr_array((size, size), dtype=np.int32)
+    pairs = sparse.load_npz(io.BytesIO(data)).tocsr()
+    size = max(size, pairs.shape[0])
+    pairs.resize((size, size))
+    return pairs
+
+
+def dump_matrix(pairs):
+    buffer = io.BytesIO()
+    sparse.save_npz(buffer, pairs)
+    return buffer.getvalue()
+
+
+def top_neighbours(others, orders):
+    """
+    The ``TOP_K`` entries of one matrix row as ``(product ids, orders)``,
+    most orders first and then by product id.
+    """
+    if len(orders) > TOP_K:
+        keep = orders >= np.partition(orders, -TOP_K)[-TOP_K]
+        others, orders = others[keep], orders[keep]
+    best = np.lexsort((others, -orders))[:TOP_K]
+    return others[best], orders[best]
+
+
+def store_recommendations(pairs, product_ids, chunk_size=WRITE_CHUNK_SIZE):
+    recommendations = []
+    for pk in product_ids:
+        row = slice(pairs.indptr[pk], pairs.indptr[pk + 1])
+        others, orders = top_neighbours(pairs.indices[row], pairs.data[row])
+        recommendations.append(
+            ProductRecommendation(
+                product_id=pk, product_ids=others.tolist(), orders=orders.tolist()
+            )
+        )
+    ProductRecommendation.objects.bulk_create(
+        recommendations,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["product_ids", "orders", "updated_at"],
+        batch_size=chunk_size,
+    )
+    return len(recommendations)
+
+
+@transaction.atomic
+def update_recommendations(
+    read_chunk_size=READ_CHUNK_SIZE, write_chunk_size=WRITE_CHUNK_SIZE
+):
+    """
+    Count the orders placed since the last run; returns how many products'
+    recommendations changed.
+    """
+    state = CoPurchaseMatrix.objects.select_for_update().filter(pk=1).first()
+    if state is None:
+        state = CoPurchaseMatrix(pk=1)
+
+    # Stop short of the first unsettled order; the next run starts there.
+    orders = Order.objects.filter(pk__gt=state.last_order_id)
+    unsettled = orders.filter(
+        created_at__gt=timezone.now() - SETTLE_TIME
+    ).aggregate(first=Min("pk"))["first"]
+    if unsettled is not None:
+        orders = orders.filter(pk__lt=unsettled)
+    last_order_id = orders.aggregate(last=Max("pk"))["last"]
+    if last_order_id is None:
+        return 0
+
+    order_items = OrderItem.objects.filter(
+        order_id__gt=state.last_order_id, order_id__lte=last_order_id
+    )
+    pairs = load_matrix(
+        state.matrix, Product.objects.aggregate(last=Max("pk"))["last"] + 1
+    )
+    new_pairs = sparse.csr_array(pairs.shape, dtype=np.int32)
+    for order_ids, product_ids in iter_item_chunks(order_items, read_chunk_size):
+        new_pairs += co_purchase_matrix(order_ids, product_ids, pairs.shape[0])
+    pairs += new_pairs
+    updated = store_recommendations(
+        pairs, np.flatnonzero(np.diff(new_pairs.indptr)).tolist(), write_chunk_size
+    )
+
+    state.last_order_id = last_order_id
+    state.matrix = dump_matrix(pairs)
+    state.save()
+    return updated
+
+
+@transaction.atomic
+def reset_recommendations():
+    """Forget all counted orders, so the next update counts every order."""
+    ProductRecommendation.objects.all().delete()
+    CoPurchaseMatrix.objects.all().delete()
+
+
+def recommended_product_ids(slug):
+    """
+    Ids of the products bought together with product ``slug``, best first,
+    or ``None`` when there is no such product.
+    """
+    row = (
+        Product.objects.filter(slug=slug)
+        .values_list("pk", "recommendation__product_ids")
+        .first()
+    )
+    if row is None:
+        return None
+    return row[1] or []
@@ -0,0 +1,122 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+
+# Text search configuration used for both the stored vector and queries.
+SEARCH_CONFIG = "english"
+
+
+def _text(expression):
+    return Coalesce(expression, Value(""), output_field=TextField())
+
+
+def attribute_text_subquery(attribute_value_model):
+    """All attribute values of the outer product joined into one string."""
+    return Subquery(
+        attribute_value_model.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(text=StringAgg("value", delimiter=" "))
+        .values("text")
+    )
+
+
+def build_search_vector(attribute_value_model):
+    """
+    Weighted tsvector for a product row.
+
+    Name and SKU rank highest, then the short description and attribute
+    values, then the long description. SKUs use the ``simple`` config so
+    codes are not stemmed.
+    """
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("sku", weight="A", config="simple")
+        + SearchVector(_text("short_description"), weight="B", config=SEARCH_CONFIG)
+        + SearchVector(
+            _text(attribute_text_subquery(attribute_value_model)),
+            weight="B",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector(_text("description"), weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(product_ids):
+    """Recompute the stored search vector for the given products in one UPDATE."""
+    from .models import Product, ProductAttributeValue
+
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    Product.objects.filter(pk__in=product_ids).update(
+        search_vector=build_search_vector(ProductAttributeValue)
+    )
+
+
+def search_products(queryset, text):
+    """Filter ``queryset`` by a web-style search query, best matches first."""
+    query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+    # ts_rank is a real; as a double its value round-trips through keyset
+    # pagination cursors exactly.
+    rank = Cast(SearchRank(F("search_vector"), query), FloatField())
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "-created_at", "-id")
+    )
+
+
+def suggest_products(text, limit=10):
+    """
+    Typo-tolerant autocomplete rows for active products.
+
+    Matches product names, or products in a category whose name matches,
+    through the ``gin_trgm_ops`` indexes. Prefix matches come first, then
+    closer trigram word similarity. Returns plain dicts with the feature
+    image (or first image) path instead of prefetching every image.
+    """
+    from .models import Category, Product, ProductImage
+
+    category_ids = list(
+        Category.objects.filter(name__trigram_word_similar=text).values_list(
+            "id", flat=True
+        )[:limit]
+    )
+    feature_image = (
+        ProductImage.objects.filter(product=OuterRef("pk"))
+        .order_by("-is_feature", "id")
+        .values("image")[:1]
+    )
+    return (
+        Product.objects.filter(is_active=True)
+        .filter(Q(name__trigram_word_similar=text) | Q(category_id__in=category_ids))
+        .annotate(
+            is_prefix=Case(
+                When(name__istartswith=text, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            similarity=TrigramWordSimilarity(text, "name"),
+            image=Subquery(feature_image),
+        )
+        .order_by("-is_prefix", "-similarity", "name")
+        .values("id", "name", "slug", "price", "image")[:limit]
+    )
@@ -1,5 +1,20 @@
+from collections import Counter
+
+from django.core import signing
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
+from .fieldsets import SparseFieldsetMixin
+from .images import derivative_srcset
+from .uploads import (
+    MAX_UPLOAD_SIZE,
+    MAX_UPLOADS_PER_REQUEST,
+    unsign_upload,
+    upload_content_types,
+    uploaded_object,
+)
+from .inventory import BULK_UPDATE_MAX_ROWS
+from .recommendations import TOP_K
 from .models import (
     Category,
     Product,
@@ -10,11 +25,18 @@ from .models import (
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Category
-        fields = ["id", "name", "slug", "image", "description", "created_at"]
+        fields = ["id", "name", "slug", "image", "srcset", "description", "created_at"]
         read_only_fields = ["slug", "created_at"]
 
+    def get_srcset(self, obj):
+        return derivative_srcset(
+            obj.image.name, obj.image_derivatives, self.context.get("request")
+        )
+
 
 class ProductAttributeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,9 +46,16 @@ class ProductAttributeSerializer(serializers.ModelSerializer):
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "alt_text", "is_feature"]
+        fields = ["id", "image", "srcset", "alt_text", "is_feature"]
+
+    def get_srcset(self, obj):
+        return derivative_srcset(
+            obj.image.name, obj.image_derivatives, self.context.get("request")
+        )
 
 
 class ProductAttributeValueSerializer(serializers.ModelSerializer):
@@ -37,9 +66,71 @@ class ProductAttributeValueSerializer(serializers.ModelSerializer):
         fields = ["attribute", "value"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductAttributeValuesField(serializers.Field):
+    """
+    Attribute values of a product, read from the ``attribute_values_data``
+    annotation (see models.attribute_values_array) when the queryset has it.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, product):
+        if hasattr(product, "attribute_values_data"):
+            # jsonb reorders keys, so restore the serializer's field order
+            return [
+                {"attribute": item["attribute"], "value": item["value"]}
+                for item in product.attribute_values_data
+            ]
+        return ProductAttributeValueSerializer(
+            product.attribute_values.all(), many=True
+        ).data
+
+
+class ProductFeatureImageField(serializers.Field):
+    """
+    The feature image (or first image) of a product, read from the
+    ``feature_image_data`` annotation (see models.feature_image_data) when
+    the queryset has it.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, product):
+        if hasattr(product, "feature_image_data"):
+            data = product.feature_image_data
+            if not data:
+                return None
+            name, derivatives = data["image"], data["image_derivatives"]
+        else:
+            images = sorted(
+                product.images.all(), key=lambda image: (not image.is_feature, image.id)
+            )
+            if not images:
+                return None
+            name, derivatives = images[0].image.name, images[0].image_derivatives
+
+        request = self.context.get("request")
+        url = default_storage.url(name)
+        return {
+            "image": request.build_absolute_uri(url) if request is not None else url,
+            "srcset": derivative_srcset(name, derivatives, request),
+        }
+
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
-    attribute_values = ProductAttributeValueSerializer(many=True, read_only=True)
+    attribute_values = ProductAttributeValuesField()
+    feature_image = ProductFeatureImageField()
+
+    # ?fields=name,slug,price,feature_image is all a listing grid needs
+    optional_fields = ("feature_image",)
+    expandable_fields = {"category": lambda: CategorySerializer(read_only=True)}
     vendor = serializers.StringRelatedField(read_only=True)
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
 
@@ -62,6 +153,7 @@ class ProductSerializer(serializers.ModelSerializer):
             "updated_at",
             "images",
             "attribute_values",
+            "feature_image",
         ]
         extra_kwargs = {
             "slug": {"required": False},
@@ -137,14 +229,102 @@ class ProductSerializer(serializers.ModelSerializer):
         return product
 
 
-class ProductSuggestionSerializer(serializers.ModelSerializer):
-    images = ProductImageSerializer(many=True)
-    # category = serializers.CharField(source="category.name")
-    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
+class ProductSuggestionSerializer(serializers.Serializer):
+    # Renders the slim rows from products.search.suggest_products
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    slug = serializers.SlugField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    image = serializers.SerializerMethodField()
 
-    class Meta:
-        model = Product
-        fields = ["id", "name", "slug", "price", "category", "images"]
+    def get_image(self, obj):
+        if not obj["image"]:
+            return None
+        url = default_storage.url(obj["image"])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class ProductStockUpdateSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=50)
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    discount_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+    stock = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+
+class ProductBulkUpdateSerializer(serializers.Serializer):
+    products = ProductStockUpdateSerializer(
+        many=True, allow_empty=False, max_length=BULK_UPDATE_MAX_ROWS
+    )
+
+    def validate_products(self, rows):
+        counts = Counter(row["sku"] for row in rows)
+        duplicates = sorted(sku for sku, count in counts.items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(
+                f"Duplicate SKUs: {', '.join(duplicates)}."
+            )
+        return rows
+
+
+class ProductExportQuerySerializer(serializers.Serializer):
+    updated_since = serializers.DateTimeField(required=False)
+
+
+class ProductRecommendationQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=TOP_K, default=10)
+
+
+class ProductImageUploadRequestSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=upload_content_types())
+    size = serializers.IntegerField(
+        min_value=1, max_value=MAX_UPLOAD_SIZE, required=False
+    )
+
+
+class ProductImageUploadTargetsSerializer(serializers.Serializer):
+    files = ProductImageUploadRequestSerializer(
+        many=True, allow_empty=False, max_length=MAX_UPLOADS_PER_REQUEST
+    )
+
+
+class ProductImageConfirmSerializer(serializers.Serializer):
+    upload_id = serializers.CharField()
+    alt_text = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    is_feature = serializers.BooleanField(required=False, default=False)
+
+    def validate_upload_id(self, value):
+        try:
+            upload = unsign_upload(value)
+        except signing.SignatureExpired:
+            raise serializers.ValidationError("This upload has expired.") from None
+        except signing.BadSignature:
+            raise serializers.ValidationError("Invalid upload id.") from None
+        if upload["p"] != self.context["product"].pk:
+            raise serializers.ValidationError("Upload belongs to another product.")
+
+        uploaded = uploaded_object(upload["k"])
+        if uploaded is None:
+            raise serializers.ValidationError("Nothing was uploaded for this id.")
+        size, content_type = uploaded
+        if size > MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError("The uploaded file is too large.")
+        if content_type != upload["t"]:
+            raise serializers.ValidationError(
+                f"The uploaded file must be {upload['t']}."
+            )
+        return upload["k"]
+
+
+class ProductImageConfirmListSerializer(serializers.Serializer):
+    uploads = ProductImageConfirmSerializer(
+        many=True, allow_empty=False, max_length=MAX_UPLOADS_PER_REQUEST
+    )
 
 
 # class ProductSerializer(serializers.ModelSerializer):
@@ -0,0 +1,204 @@
+from threading import local
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .attributes import update_attribute_maps
+from mayfair_api.accounts.models import VendorProfile
+
+from .caching import CATALOG_VERSION, bump_version
+from .cards import mark_stale
+from .categories import CATEGORY_TREE_VERSION
+from .models import (
+    Category,
+    Product,
+    ProductAttribute,
+    ProductAttributeValue,
+    ProductImage,
+    touch_products,
+)
+from .search import update_search_vectors
+from .suggestions import is_enabled as suggestion_index_enabled
+from .suggestions import publish_change
+from .tasks import schedule_image_derivatives
+
+
+class _ProductRefresh:
+    """
+    Search vector, attribute map and ``updated_at`` refreshes queued by one
+    transaction.
+    """
+
+    def __init__(self, run_on_commit):
+        # The connection's callback list this refresh was registered on
+        self.run_on_commit = run_on_commit
+        self.search_ids = set()
+        self.attribute_ids = set()
+        self.touched_ids = set()
+        self.deleted_ids = set()
+        self.ran = False
+
+    def __call__(self):
+        self.ran = True
+        attribute_ids = self.attribute_ids - self.deleted_ids
+        update_attribute_maps(attribute_ids)
+        update_search_vectors((self.search_ids | attribute_ids) - self.deleted_ids)
+        touch_products(self.touched_ids - self.deleted_ids)
+
+
+_pending = local()
+
+
+def pending_refresh():
+    """
+    The refresh that runs once the current transaction commits. Commits and
+    rollbacks replace the connection's callback list, which retires it, as
+    does running it early (``captureOnCommitCallbacks(execute=True)``).
+    """
+    connection = transaction.get_connection()
+    refresh = getattr(_pending, "refresh", None)
+    if (
+        refresh is None
+        or refresh.ran
+        or refresh.run_on_commit is not connection.run_on_commit
+    ):
+        refresh = _ProductRefresh(connection.run_on_commit)
+        _pending.refresh = refresh
+        transaction.on_commit(refresh)
+    return refresh
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if transaction.get_connection().in_atomic_block:
+        pending_refresh().search_ids.add(instance.pk)
+    else:
+        update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=ProductAttributeValue)
+@receiver(post_delete, sender=ProductAttributeValue)
+def refresh_attribute_search_vector(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if transaction.get_connection().in_atomic_block:
+        pending_refresh().attribute_ids.add(instance.product_id)
+    else:
+        update_attribute_maps([instance.product_id])
+        update_search_vectors([instance.product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductAttributeValue)
+@receiver(post_delete, sender=ProductAttributeValue)
+def touch_changed_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if transaction.get_connection().in_atomic_block:
+        pending_refresh().touched_ids.add(instance.product_id)
+    else:
+        touch_products([instance.product_id])
+
+
+@receiver(pre_delete, sender=Product)
+def skip_deleted_product_refresh(sender, instance, **kwargs):
+    # Its attribute values are deleted after this, and queue it again
+    if transaction.get_connection().in_atomic_block:
+        pending_refresh().deleted_ids.add(instance.pk)
+
+
+@receiver(post_save, sender=ProductAttribute)
+def refresh_renamed_attribute(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    product_ids = set(
+        ProductAttributeValue.objects.filter(attribute=instance).values_list(
+            "product_id", flat=True
+        )
+    )
+    update_attribute_maps(product_ids)
+    touch_products(product_ids)
+    mark_stale(product_ids)
+
+
+@receiver(post_save, sender=ProductImage)
+def render_product_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_image_derivatives("product_image", instance)
+
+
+@receiver(post_save, sender=Category)
+def render_category_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_image_derivatives("category", instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def publish_suggestion_change(sender, instance, raw=False, **kwargs):
+    if raw or not suggestion_index_enabled():
+        return
+    if sender is Category:
+        change = ("category", instance.pk)
+    elif sender is ProductImage:
+        change = ("product", instance.product_id)
+    else:
+        change = ("product", instance.pk)
+    transaction.on_commit(lambda: publish_change(*change))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_version(CATEGORY_TREE_VERSION))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+@receiver(post_save, sender=ProductAttributeValue)
+@receiver(post_delete, sender=ProductAttributeValue)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_version(CATALOG_VERSION))
+
+
+@receiver(post_save, sender=Product)
+def mark_product_card_stale(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_stale([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductAttributeValue)
+@receiver(post_delete, sender=ProductAttributeValue)
+def mark_related_card_stale(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_stale([instance.product_id])
+
+
+@receiver(pre_delete, sender=Category)
+def mark_category_cards_stale(sender, instance, **kwargs):
+    # Products are detached with a bulk UPDATE that sends no signals
+    mark_stale(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=VendorProfile)
+def mark_vendor_cards_stale(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        mark_stale(instance.products.values_list("pk", flat=True))
@@ -0,0 +1,471 @@
+"""
+In-process autocomplete index for ProductSearchSuggestionsView.
+
+Enabled with ``PRODUCT_SUGGESTION_ENGINE = "memory"``. Each worker keeps a
+sorted, array-backed prefix index over active product names and category
+names and answers suggestion requests from it without touching the database.
+
+The index is built in a background thread when the worker boots. Product,
+ProductImage and Category writes are published to a change feed in the cache
+(a sequence counter plus one key per change) and every worker replays that
+feed into its own index, rebuilding it in the background once enough
+replayed changes have built up. Until the first build finishes, or after the feed
+has expired past what a worker has seen, ``search`` returns ``None`` and the
+view falls back to the database path.
+
+Searches don't take the lock: they read one ``_Snapshot`` of the index, and
+builds and replays publish a new snapshot instead of changing one that a
+search may be reading.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from decimal import Decimal
+from heapq import merge
+from itertools import islice, takewhile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+
+logger = logging.getLogger(__name__)
+
+FEED_SEQUENCE_KEY = "products:suggestions:seq"
+FEED_ENTRY_KEY = "products:suggestions:change:{}"
+FEED_TIMEOUT = 60 * 60
+# Replaying more changes than this is slower than a rebuild.
+MAX_FEED_BACKLOG = 5000
+POLL_INTERVAL = 1.0
+MAX_CANDIDATES = 200
+# Replayed index changes a worker holds before rebuilding in the background.
+MAX_PENDING_CHANGES = 20_000
+
+_WORD_RE = re.compile(r"\w+")
+_SEPARATOR = "\0"
+
+
+def is_enabled():
+    return getattr(settings, "PRODUCT_SUGGESTION_ENGINE", "database") == "memory"
+
+
+def normalize(text):
+    return " ".join(_WORD_RE.findall((text or "").casefold()))
+
+
+def index_keys(text):
+    """The normalized text from the start of each word, e.g. "red shoe", "shoe"."""
+    text = normalize(text)
+    return [text[match.start() :] for match in _WORD_RE.finditer(text)]
+
+
+def publish_change(kind, pk):
+    """Append a ``("product" | "category", pk)`` change to the shared feed."""
+    try:
+        sequence = cache.incr(FEED_SEQUENCE_KEY)
+    except ValueError:
+        # The first change, or the counter was evicted. Workers that had seen
+        # a higher sequence rebuild.
+        if cache.add(FEED_SEQUENCE_KEY, 1, None):
+            sequence = 1
+        else:
+            sequence = cache.incr(FEED_SEQUENCE_KEY)
+    cache.set(FEED_ENTRY_KEY.format(sequence), (kind, pk), FEED_TIMEOUT)
+
+
+def _product_rows(**filters):
+    from .models import Product, ProductImage
+
+    feature_image = (
+        ProductImage.objects.filter(product=OuterRef("pk"))
+        .order_by("-is_feature", "id")
+        .values("image")[:1]
+    )
+    return (
+        Product.objects.filter(is_active=True, **filters)
+        .annotate(image=Subquery(feature_image))
+        .values_list("id", "name", "slug", "price", "image", "category_id")
+        .iterator(chunk_size=2000)
+    )
+
+
+class _PrefixIndex:
+    """
+    Word-start offsets into one shared text buffer, sorted by the text that
+    follows them, with a parallel array of integer slots.
+
+    Changes replayed from the feed don't touch the sorted arrays: additions
+    go to a small sorted ``pending`` list of ``(key, slot, text)`` and
+    removals mark positions in ``removed``. ``changes`` tells the owner when
+    a rebuild is due.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.offsets = array("I")
+        self.slots = array("I")
+        self.removed = set()
+        self.pending = []
+
+    @property
+    def changes(self):
+        return len(self.pending) + len(self.removed)
+
+    def bulk_load(self, entries):
+        """Replace the index with ``(text, slot)`` entries."""
+        parts, starts, slots = [], array("I"), array("I")
+        length = 0
+        for name, slot in entries:
+            text = normalize(name)
+            for match in _WORD_RE.finditer(text):
+                starts.append(length + match.start())
+                slots.append(slot)
+            parts.append(text)
+            length += len(text) + 1
+        # Names end with a separator that sorts before any word character.
+        buffer = "".join(f"{part}{_SEPARATOR}" for part in parts)
+        del parts
+        order = sorted(
+            range(len(starts)),
+            key=lambda entry: buffer[
+                starts[entry] : buffer.index(_SEPARATOR, starts[entry])
+            ],
+        )
+        self.text = buffer
+        self.offsets = array("I", (starts[entry] for entry in order))
+        self.slots = array("I", (slots[entry] for entry in order))
+        self.removed = set()
+        self.pending = []
+
+    def copy(self):
+        """A copy sharing the sorted arrays, to apply changes to."""
+        new = _PrefixIndex()
+        new.text, new.offsets, new.slots = self.text, self.offsets, self.slots
+        new.removed = set(self.removed)
+        new.pending = list(self.pending)
+        return new
+
+    def add(self, text, slot):
+        text = normalize(text)
+        for key in index_keys(text):
+            insort(self.pending, (key, slot, text))
+
+    def remove(self, text, slot):
+        for key in index_keys(text):
+            entry = (key, slot)
+            position = bisect_left(self.pending, entry)
+            if position < len(self.pending) and self.pending[position][:2] == entry:
+                del self.pending[position]
+                continue
+            # An exact key sorts before the longer keys it is a prefix of.
+            for position in self._positions(key):
+                if self._key(position) != key:
+                    break
+                if self.slots[position] == slot:
+                    self.removed.add(position)
+                    break
+
+    def _key(self, position):
+        start = self.offsets[position]
+        return self.text[start : self.text.index(_SEPARATOR, start)]
+
+    def _positions(self, prefix):
+        """Live positions whose text starts with ``prefix``, in order."""
+        size = len(prefix)
+        position = bisect_left(
+            self.offsets, prefix, key=lambda start: self.text[start : start + size]
+        )
+        while position < len(self.offsets):
+            start = self.offsets[position]
+            if self.text[start : start + size] != prefix:
+                return
+            if position not in self.removed:
+                yield position
+            position += 1
+
+    def _indexed(self, prefix, *, keyed):
+        """``(key, slot, text starts with prefix)``; keys only if ``keyed``."""
+        for position in self._positions(prefix):
+            start = self.offsets[position]
+            text_start = self.text.rfind(_SEPARATOR, 0, start) + 1
+            yield (
+                self._key(position) if keyed else None,
+                self.slots[position],
+                self.text.startswith(prefix, text_start),
+            )
+
+    def scan(self, prefix, limit):
+        """
+        Up to ``limit`` slots with a key starting with ``prefix``, in key
+        order, each mapped to whether its whole text starts with ``prefix``.
+        """
+        if self.pending:
+            pending = takewhile(
+                lambda entry: entry[0].startswith(prefix),
+                islice(self.pending, bisect_left(self.pending, (prefix,)), None),
+            )
+            entries = merge(
+                self._indexed(prefix, keyed=True),
+                ((key, slot, text.startswith(prefix)) for key, slot, text in pending),
+            )
+        else:
+            entries = self._indexed(prefix, keyed=False)
+        found = {}
+        for _, slot, starts in entries:
+            if slot not in found:
+                found[slot] = starts
+                if len(found) == limit:
+                    break
+        return found
+
+
+class _Snapshot:
+    """
+    One consistent version of the index, never changed once published.
+
+    Product payloads live in parallel lists indexed by slot; prices as
+    integer cents. The lists are append-only and shared with the copies
+    that replays make, so a slot an older snapshot can reach never changes;
+    replaced and deleted products keep their slot until the next build.
+    ``product_slots`` and ``category_names`` are only read by the writer,
+    under the index lock, and are shared with copies too.
+    """
+
+    def __init__(self):
+        self.product_slots = {}
+        self.ids = array("q")
+        self.names = []
+        self.slugs = []
+        self.price_cents = array("q")
+        self.images = []
+        self.category_ids = array("q")
+        self.products = _PrefixIndex()
+        self.category_names = {}
+        self.category_members = {}
+        self.categories = _PrefixIndex()
+        # Member sets this snapshot made itself and may change.
+        self._own_members = set()
+
+    def copy(self):
+        new = _Snapshot()
+        for name in (
+            "product_slots",
+            "ids",
+            "names",
+            "slugs",
+            "price_cents",
+            "images",
+            "category_ids",
+            "category_names",
+        ):
+            setattr(new, name, getattr(self, name))
+        new.products = self.products.copy()
+        new.categories = self.categories.copy()
+        new.category_members = dict(self.category_members)
+        return new
+
+    def _members(self, category_id):
+        if category_id not in self._own_members:
+            self.category_members[category_id] = set(
+                self.category_members.get(category_id, ())
+            )
+            self._own_members.add(category_id)
+        return self.category_members[category_id]
+
+    def store(self, row):
+        pk, name, slug, price, image, category_id = row
+        slot = len(self.ids)
+        self.ids.append(pk)
+        self.names.append(name)
+        self.slugs.append(slug)
+        self.price_cents.append(int(price * 100))
+        self.images.append(image)
+        self.category_ids.append(category_id or 0)
+        self.product_slots[pk] = slot
+        self._members(category_id).add(slot)
+        return slot
+
+    def apply_products(self, rows, pks):
+        """Replace products ``pks`` with their current ``rows``."""
+        for pk in pks:
+            slot = self.product_slots.pop(pk, None)
+            if slot is not None:
+                self.products.remove(self.names[slot], slot)
+                self._members(self.category_ids[slot] or None).discard(slot)
+        for row in rows:
+            self.products.add(row[1], self.store(row))
+
+    def apply_categories(self, rows, pks):
+        """Replace categories ``pks`` with their current ``(id, name)`` rows."""
+        for pk in pks:
+            self.categories.remove(self.category_names.pop(pk, ""), pk)
+        for pk, name in rows:
+            self.category_names[pk] = name
+            self.categories.add(name, pk)
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._ready = False
+        self._building = False
+        self._sequence = 0
+        self._polled_at = 0.0
+        self.snapshot = _Snapshot()
+
+    @property
+    def ready(self):
+        return self._ready and self._pid == os.getpid()
+
+    def warm(self):
+        """Start a background build for this process if one is needed."""
+        if is_enabled() and not self.ready:
+            self.rebuild()
+
+    def rebuild(self, *, background=True):
+        """
+        Start a build unless this process is running one, in a background
+        thread unless ``background`` is false.
+        """
+        with self._lock:
+            if self._building and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Forked from a parent that had already started building.
+                self._ready = False
+            self._pid = os.getpid()
+            self._building = True
+        if not background:
+            self._build()
+            return
+        threading.Thread(
+            target=self._build, name="product-suggestions", daemon=True
+        ).start()
+
+    def _build(self):
+        from .models import Category
+
+        started = time.monotonic()
+        try:
+            # Anything published after this point is replayed on top.
+            sequence = cache.get(FEED_SEQUENCE_KEY, 0)
+            fresh = _Snapshot()
+            fresh.products.bulk_load(
+                (row[1], fresh.store(row)) for row in _product_rows()
+            )
+            for pk, name in Category.objects.values_list("id", "name").iterator():
+                fresh.category_names[pk] = name
+            fresh.categories.bulk_load(
+                (name, pk) for pk, name in fresh.category_names.items()
+            )
+
+            with self._lock:
+                self.snapshot = fresh
+                self._sequence = sequence
+                self._ready = True
+            logger.info(
+                "Built product suggestion index: %s products in %.2fs",
+                len(fresh.product_slots),
+                time.monotonic() - started,
+            )
+        except Exception:
+            logger.exception("Failed to build product suggestion index")
+        finally:
+            self._building = False
+            connection.close()
+
+    def _poll(self):
+        from .models import Category
+
+        now = time.monotonic()
+        if now - self._polled_at < POLL_INTERVAL:
+            return
+        self._polled_at = now
+
+        latest = cache.get(FEED_SEQUENCE_KEY, 0)
+        if latest == self._sequence:
+            return
+        # A counter behind ours was restarted after an eviction.
+        if latest < self._sequence or latest - self._sequence > MAX_FEED_BACKLOG:
+            self._ready = False
+            return
+
+        keys = [
+            FEED_ENTRY_KEY.format(seq) for seq in range(self._sequence + 1, latest + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            # Part of the feed expired before we saw it.
+            self._ready = False
+            return
+
+        products = {pk for kind, pk in changes.values() if kind == "product"}
+        categories = {pk for kind, pk in changes.values() if kind == "category"}
+        # Read everything first: the writer-side lookups are shared with the
+        # published snapshot and must not be left half updated.
+        product_rows = list(_product_rows(pk__in=products)) if products else []
+        category_rows = (
+            list(Category.objects.filter(pk__in=categories).values_list("id", "name"))
+            if categories
+            else []
+        )
+        snapshot = self.snapshot.copy()
+        snapshot.apply_products(product_rows, products)
+        snapshot.apply_categories(category_rows, categories)
+        self.snapshot = snapshot
+        self._sequence = latest
+
+    def search(self, query, limit=10):
+        """
+        Suggestion rows shaped like ``search.suggest_products``, or ``None``
+        when the index cannot answer yet.
+        """
+        if not self.ready:
+            self.warm()
+            return None
+        if self._lock.acquire(blocking=False):
+            try:
+                self._poll()
+            finally:
+                self._lock.release()
+        if not self.ready:
+            self.warm()
+            return None
+        snapshot = self.snapshot
+        # Fold replayed changes into fresh sorted arrays; this snapshot keeps
+        # answering until the new one is swapped in.
+        if snapshot.products.changes + snapshot.categories.changes > (
+            MAX_PENDING_CHANGES
+        ):
+            self.rebuild()
+
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        matches = snapshot.products.scan(prefix, MAX_CANDIDATES)
+        if len(matches) < limit:
+            for category_id in snapshot.categories.scan(prefix, limit):
+                for slot in snapshot.category_members.get(category_id, ()):
+                    matches.setdefault(slot, False)
+        # Whole-name prefix matches first, then alphabetical.
+        names = snapshot.names
+        slots = sorted(matches, key=lambda slot: (not matches[slot], names[slot]))
+        return [
+            {
+                "id": snapshot.ids[slot],
+                "name": names[slot],
+                "slug": snapshot.slugs[slot],
+                "price": Decimal(snapshot.price_cents[slot]).scaleb(-2),
+                "image": snapshot.images[slot],
+            }
+            for slot in slots[:limit]
+        ]
+
+
+suggestion_index = SuggestionIndex()
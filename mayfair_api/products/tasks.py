@@ -0,0 +1,98 @@
+import logging
+
+from celery import shared_task
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .caching import CATALOG_VERSION, bump_version
+from .cards import mark_stale, rebuild_cards
+from .categories import CATEGORY_TREE_VERSION
+from .images import InvalidImageError, build_derivatives, delete_derivatives
+from .models import Category, ProductImage, touch_products
+from .popularity import flush_buckets
+from .recommendations import update_recommendations
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MODELS = {"product_image": ProductImage, "category": Category}
+
+
+@shared_task
+def generate_image_derivatives(kind, pk):
+    """Render resized derivatives for a ProductImage or Category image."""
+    model = IMAGE_MODELS[kind]
+    fields = ["image", "image_derivatives"]
+    if model is ProductImage:
+        fields.append("product_id")
+    instance = model.objects.filter(pk=pk).only(*fields).first()
+    if instance is None or not instance.image:
+        return
+    previous = instance.image_derivatives
+    if previous.get("source") == instance.image.name:
+        return
+
+    try:
+        derivatives = build_derivatives(instance.image)
+    except InvalidImageError as error:
+        logger.warning("%s %s: %s", kind, pk, error)
+        if model is ProductImage:
+            # Direct uploads are confirmed from their metadata alone; this is
+            # the first look at the bytes.
+            name = instance.image.name
+            if ProductImage.objects.filter(pk=pk, image=name).delete()[0]:
+                default_storage.delete(name)
+        return
+
+    # Only record them if the image wasn't replaced while rendering.
+    updated = model.objects.filter(pk=pk, image=instance.image.name).update(
+        image_derivatives=derivatives
+    )
+    if not updated:
+        delete_derivatives(derivatives)
+        return
+    delete_derivatives(
+        {
+            image_format: {
+                width: name
+                for width, name in names.items()
+                if name != derivatives.get(image_format, {}).get(width)
+            }
+            for image_format, names in previous.items()
+            if image_format != "source"
+        }
+    )
+    bump_version(CATALOG_VERSION)
+    if model is Category:
+        bump_version(CATEGORY_TREE_VERSION)
+    else:
+        touch_products([instance.product_id])
+        mark_stale([instance.product_id])
+
+
+@shared_task
+def rebuild_product_cards(product_ids):
+    """Re-render stored listing cards; see products.cards."""
+    return rebuild_cards(product_ids)
+
+
+@shared_task
+def flush_product_popularity():
+    """Fold buffered popularity counters into Product.popularity."""
+    return flush_buckets()
+
+
+# Incremental runs cover an hour of orders; rebuilding from scratch is left
+# to the update_product_recommendations command.
+@shared_task(soft_time_limit=15 * 60, time_limit=20 * 60)
+def update_product_recommendations():
+    """Count new orders into the "frequently bought together" lists."""
+    return update_recommendations()
+
+
+def schedule_image_derivatives(kind, instance):
+    """Queue derivative rendering once the current transaction commits."""
+    if not instance.image:
+        return
+    if instance.image_derivatives.get("source") == instance.image.name:
+        return
+    transaction.on_commit(lambda: generate_image_derivatives.delay(kind, instance.pk))
@@ -1,3 +1,482 @@
-from django.test import TestCase
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from mayfair_api.accounts.models import User, VendorProfile
+
+from .caching import CATALOG_VERSION, VERSION_KEY, bump_version, get_version
+from .categories import build_category_tree, rebuild_category_paths
+from .export import export_queryset
+from .fastpath import product_values, render_products
+from .filters import ProductFilter
+from .importer import ImportFileError, ProductImporter, iter_rows
+from .inventory import bulk_update_stock
+from .models import (
+    Category,
+    Product,
+    ProductAttribute,
+    ProductAttributeValue,
+    ProductImage,
+)
+from .serializers import ProductSerializer
+
+
+def statements(context):
+    """Captured SQL without the savepoints ATOMIC_REQUESTS adds in a TestCase."""
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if "SAVEPOINT" not in query["sql"]
+    ]
+
+
+class ProductTestData(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(
+            email="vendor@example.com",
+            password="password",
+            first_name="Ada",
+            last_name="Vendor",
+            phone_number="+2348012345678",
+            user_type="vendor",
+            is_active=True,
+        )
+        vendor = VendorProfile.objects.create(
+            user=user,
+            email="vendor@example.com",
+            phone_number="+2348012345678",
+            business_name="Ada Goods",
+        )
+        category = Category.objects.create(name="Shoes")
+        cls.product = Product.objects.create(
+            vendor=vendor,
+            category=category,
+            name="Trail Runner",
+            price=Decimal("120.00"),
+            stock=5,
+            description="Grippy trail running shoe",
+        )
+        for index in range(3):
+            ProductImage.objects.create(
+                product=cls.product,
+                image=f"product_images/trail-runner-{index}.jpg",
+                is_feature=index == 0,
+            )
+        for name, value in (("color", "green"), ("size", "42"), ("fit", "wide")):
+            ProductAttributeValue.objects.create(
+                product=cls.product,
+                attribute=ProductAttribute.objects.create(name=name),
+                value=value,
+            )
+        # Nullable and empty relations: a discount, no images or attributes.
+        cls.bare_product = Product.objects.create(
+            vendor=vendor,
+            category=category,
+            name="Road Runner",
+            price=Decimal("80.50"),
+            discount_price=Decimal("60.25"),
+            stock=0,
+        )
+
+
+class ProductDetailQueryBudgetTests(ProductTestData):
+    def test_detail_stays_within_query_budget(self):
+        url = reverse("product-detail", kwargs={"slug": self.product.slug})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        queries = statements(context)
+        self.assertLessEqual(len(queries), 2, queries)
+        self.assertEqual(len(response.json()["images"]), 3)
+        self.assertEqual(len(response.json()["attribute_values"]), 3)
+
+
+class FastListParityTests(ProductTestData):
+    def assert_parity(self, params=None):
+        request = Request(APIRequestFactory().get("/api/products/", params))
+        queryset = Product.objects.order_by("id")
+        expected = ProductSerializer(
+            queryset, many=True, context={"request": request}
+        ).data
+        rendered = render_products(list(product_values(queryset, request)), request)
+        self.assertEqual(rendered, expected)
+
+    def test_full_products_match_serializer(self):
+        self.assert_parity()
+
+    def test_sparse_fields_match_serializer(self):
+        self.assert_parity({"fields": "id,name,price,images,feature_image"})
+
+
+class KeysetPaginationTests(ProductTestData):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Tied prices and a mix of discounted and undiscounted products.
+        for index, discount in enumerate((None, "90.00", None, "90.00", "40.00")):
+            Product.objects.create(
+                vendor=cls.product.vendor,
+                category=cls.product.category,
+                name=f"Runner {index}",
+                price=Decimal("100.00"),
+                discount_price=discount and Decimal(discount),
+                stock=1,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("product-list")
+
+    def walk(self, url, params=None, link="next"):
+        """
+        Pages of product ids following ``link`` until it runs out, and the
+        last response.
+        """
+        pages = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append([product["id"] for product in response.json()["results"]])
+            url, params = response.json()[link], None
+        return pages, response
+
+    def assert_walks(self, ordering, expected):
+        pages, _ = self.walk(self.url, {"ordering": ordering, "page_size": 2})
+        self.assertEqual(sum(pages, []), list(expected))
+        self.assertTrue(all(len(page) == 2 for page in pages[:-1]), pages)
+
+    def test_pages_seek_past_ties(self):
+        products = Product.objects.values_list("pk", flat=True)
+        self.assert_walks("price", products.order_by("effective_price", "id"))
+        self.assert_walks("-created_at", products.order_by("-created_at", "-id"))
+
+    def test_null_values_come_last_both_ways(self):
+        products = Product.objects.values_list("pk", flat=True)
+        nulls = products.filter(discount_price__isnull=True)
+        discounted = products.filter(discount_price__isnull=False)
+        self.assert_walks(
+            "discount_price",
+            [*discounted.order_by("discount_price", "id"), *nulls.order_by("id")],
+        )
+        self.assert_walks(
+            "-discount_price",
+            [*discounted.order_by("-discount_price", "-id"), *nulls.order_by("-id")],
+        )
+
+    def test_previous_links_walk_back(self):
+        for ordering in ("discount_price", "-discount_price", "name"):
+            forward, last = self.walk(self.url, {"ordering": ordering, "page_size": 3})
+            backward, first = self.walk(last.json()["previous"], link="previous")
+            self.assertEqual(backward, forward[-2::-1], ordering)
+            self.assertIsNone(first.json()["previous"])
+
+    def test_cursor_round_trips_its_position(self):
+        first = self.client.get(self.url, {"ordering": "price", "page_size": 2})
+        cursor = parse_qs(urlsplit(first.json()["next"]).query)["cursor"][0]
+        position = json.loads(urlsafe_b64decode(cursor))
+        last = first.json()["results"][-1]
+        self.assertEqual(position["o"], "effective_price")
+        self.assertEqual(position["id"], last["id"])
+        self.assertEqual(
+            Decimal(position["v"]), Product.objects.get(pk=last["id"]).effective_price
+        )
+
+        second = self.client.get(first.json()["next"])
+        self.assertEqual(
+            self.client.get(second.json()["previous"]).json(), first.json()
+        )
+
+    def test_bad_cursors_are_not_found(self):
+        def cursor(position):
+            return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+        valid = {"o": "effective_price", "v": "10.00", "id": 1, "d": "n"}
+        for bad in (
+            "not-a-cursor",
+            cursor({**valid, "o": "name"}),
+            cursor({**valid, "d": "x"}),
+            cursor({**valid, "v": "cheap"}),
+            cursor({**valid, "id": "one"}),
+            cursor({"o": "effective_price"}),
+        ):
+            response = self.client.get(self.url, {"ordering": "price", "cursor": bad})
+            self.assertEqual(response.status_code, 404, bad)
+
+
+class CategoryPathTests(ProductTestData):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # As loaddata or bulk_create leave them: no paths, children first.
+        cls.running, cls.trail = Category.objects.bulk_create(
+            [Category(name="Running", slug="running"), Category(name="Trail")]
+        )
+        cls.trail.slug = "trail"
+        cls.running.parent = cls.trail
+        Category.objects.bulk_update([cls.running, cls.trail], ["slug", "parent"])
+        cls.product.category = cls.running
+        cls.product.save()
+
+    def filtered(self, category):
+        return set(
+            ProductFilter({"category": category}, queryset=Product.objects.all()).qs
+        )
+
+    def test_category_without_path_matches_only_itself(self):
+        self.assertEqual(self.filtered("running"), {self.product})
+        self.assertEqual(self.filtered("trail"), set())
+
+    def test_tree_tolerates_stale_paths(self):
+        Category.objects.filter(pk=self.trail.pk).update(path="zz/")
+        roots = {node["slug"]: node for node in build_category_tree()}
+        self.assertEqual(roots["trail"]["children"][0]["slug"], "running")
+
+    def test_rebuild_restores_subtree_filtering(self):
+        self.assertEqual(rebuild_category_paths(), 2)
+        self.assertEqual(self.filtered("trail"), {self.product})
+        self.assertEqual(rebuild_category_paths(), 0)
+
+    @override_settings(MEDIA_URL="/media/")
+    def test_tree_image_urls_are_absolute(self):
+        cache.clear()
+        Category.objects.filter(pk=self.trail.pk).update(image="categories/trail.jpg")
+        response = self.client.get(reverse("category-tree"))
+        images = [node["image"] for node in response.json() if node["image"]]
+        self.assertEqual(images, ["http://testserver/media/categories/trail.jpg"])
+
+
+class VersionCounterTests(SimpleTestCase):
+    def setUp(self):
+        cache.delete(VERSION_KEY.format("test"))
+
+    def test_bump_moves_to_a_new_version(self):
+        version = get_version("test")
+        self.assertEqual(bump_version("test"), version + 1)
+        self.assertEqual(get_version("test"), version + 1)
+
+    def test_evicted_counter_never_repeats_a_version(self):
+        seen = {get_version("test"), bump_version("test"), bump_version("test")}
+        cache.delete(VERSION_KEY.format("test"))
+        self.assertGreater(get_version("test"), max(seen))
+
+        seen.add(get_version("test"))
+        cache.delete(VERSION_KEY.format("test"))
+        self.assertGreater(bump_version("test"), max(seen))
+
+
+class ConditionalGetTests(ProductTestData):
+    def setUp(self):
+        self.url = reverse("product-detail", kwargs={"slug": self.product.slug})
+
+    def test_bump_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url)["ETag"], etag)
+
+        bump_version(CATALOG_VERSION)
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+    def test_matching_etag_is_answered_before_serialization(self):
+        etag = self.client.get(self.url)["ETag"]
+        with (
+            mock.patch.object(ProductSerializer, "to_representation") as serialize,
+            CaptureQueriesContext(connection) as context,
+        ):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        serialize.assert_not_called()
+        self.assertEqual(statements(context), [])
+
+    def test_evicted_counter_does_not_revalidate_old_etags(self):
+        cache.delete(VERSION_KEY.format(CATALOG_VERSION))
+        etag = self.client.get(self.url)["ETag"]
+        cache.delete(VERSION_KEY.format(CATALOG_VERSION))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ProductImporterTests(ProductTestData):
+    def import_rows(self, rows, chunk_size=100):
+        importer = ProductImporter(self.product.vendor, chunk_size=chunk_size)
+        return importer.run(rows)
+
+    def row(self, name, **fields):
+        return {"name": name, "price": "10.00", **fields}
+
+    def test_invalid_rows_are_reported_by_row_number(self):
+        report = self.import_rows(
+            [
+                self.row("Kept", category="shoes", attributes="color:red"),
+                {"name": "No price"},
+                self.row("Unknown category", category="hats"),
+                self.row("Unknown attribute", attributes="material:wool"),
+                self.row("Long value", attributes=f"color:{'x' * 256}"),
+                {"__invalid__": "[1, 2]"},
+            ]
+        )
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["failed"], 5)
+        errors = {error["row"]: set(error["errors"]) for error in report["errors"]}
+        self.assertEqual(
+            errors,
+            {
+                2: {"price"},
+                3: {"category"},
+                4: {"attributes"},
+                5: {"attributes"},
+                6: {"non_field_errors"},
+            },
+        )
+        kept = Product.objects.get(name="Kept")
+        self.assertEqual(kept.attribute_values.get().value, "red")
+
+    def test_sku_collisions_are_row_errors(self):
+        self.product.sku = "TAKEN-1"
+        self.product.save()
+
+        report = self.import_rows(
+            [
+                self.row("Existing SKU", sku="TAKEN-1"),
+                self.row("First", sku="NEW-1"),
+                self.row("Repeated SKU", sku="NEW-1"),
+            ]
+        )
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(
+            [(error["row"], list(error["errors"])) for error in report["errors"]],
+            [(1, ["sku"]), (3, ["sku"])],
+        )
+        self.assertEqual(Product.objects.get(sku="NEW-1").name, "First")
+
+    def test_each_chunk_commits_and_bumps_on_its_own(self):
+        rows = [self.row(f"Chunked {index}") for index in range(5)]
+        with self.captureOnCommitCallbacks() as callbacks:
+            report = self.import_rows(rows, chunk_size=2)
+
+        self.assertEqual(report["created"], 5)
+        # One catalog version bump per chunk.
+        self.assertEqual(len(callbacks), 3)
+
+    def test_failed_chunk_keeps_earlier_chunks(self):
+        rows = [self.row(f"Chunked {index}") for index in range(4)]
+        with (
+            mock.patch(
+                "mayfair_api.products.importer.update_search_vectors",
+                side_effect=[None, RuntimeError],
+            ),
+            self.assertRaises(RuntimeError),
+        ):
+            self.import_rows(rows, chunk_size=2)
+
+        self.assertQuerySetEqual(
+            Product.objects.filter(name__startswith="Chunked").order_by("name"),
+            ["Chunked 0", "Chunked 1"],
+            transform=str,
+        )
+
+    def test_non_utf8_file_is_rejected_before_any_row(self):
+        stream = BytesIO(b"name,price\nFirst,1\nCaf\xe9,2\n")
+
+        with self.assertRaisesMessage(ImportFileError, "offset 22"):
+            self.import_rows(iter_rows(stream, "csv"), chunk_size=1)
+        self.assertFalse(Product.objects.filter(name="First").exists())
+
+    def test_chunk_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            ProductImporter(self.product.vendor, chunk_size=0)
+
+
+class BulkUpdateStockTests(ProductTestData):
+    def test_changed_fields_are_updated_in_one_pass(self):
+        self.product.refresh_from_db()
+        bare_product = Product.objects.get(pk=self.bare_product.pk)
+        rows = [
+            {"sku": self.product.sku, "stock": 9, "price": Decimal("99.00")},
+            # Same values as stored: not an update.
+            {"sku": bare_product.sku, "stock": 0, "is_active": True},
+            {"sku": "MISSING-SKU", "stock": 1},
+        ]
+        with (
+            mock.patch("mayfair_api.products.inventory.bump_version") as bump,
+            mock.patch("mayfair_api.products.tasks.rebuild_product_cards"),
+            self.captureOnCommitCallbacks(execute=True),
+            CaptureQueriesContext(connection) as context,
+        ):
+            result = bulk_update_stock(self.product.vendor, rows)
+
+        self.assertEqual(
+            result, {"updated": [self.product.sku], "not_found": ["MISSING-SKU"]}
+        )
+        queries = statements(context)
+        locks = [sql for sql in queries if sql.endswith("FOR UPDATE")]
+        updates = [
+            sql for sql in queries if sql.startswith('UPDATE "products_product"')
+        ]
+        self.assertEqual(len(locks), 1, queries)
+        self.assertEqual(len(updates), 2, queries)
+        bump.assert_called_once_with(CATALOG_VERSION)
+
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.stock, product.price), (9, Decimal("99.00")))
+        self.assertGreater(product.updated_at, self.product.updated_at)
+        self.assertEqual(
+            Product.objects.get(pk=bare_product.pk).updated_at, bare_product.updated_at
+        )
+
+
+class IncrementalExportTests(ProductTestData):
+    @classmethod
+    def setUpTestData(cls):
+        # Run the refresh the test data queued, so changes queue a new one.
+        with (
+            mock.patch("mayfair_api.products.tasks.generate_image_derivatives"),
+            cls.captureOnCommitCallbacks(execute=True),
+        ):
+            super().setUpTestData()
+
+    def assert_exported_after(self, change):
+        since = timezone.now()
+        self.assertNotIn(self.product, export_queryset(since))
+        with (
+            mock.patch("mayfair_api.products.tasks.generate_image_derivatives"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            change()
+        self.assertIn(self.product, export_queryset(since))
+
+    def test_added_image_is_exported(self):
+        self.assert_exported_after(
+            lambda: ProductImage.objects.create(
+                product=self.product, image="product_images/new.jpg"
+            )
+        )
+
+    def test_deleted_image_is_exported(self):
+        self.assert_exported_after(self.product.images.first().delete)
+
+    def test_changed_attribute_value_is_exported(self):
+        value = self.product.attribute_values.first()
+        value.value = "changed"
+        self.assert_exported_after(value.save)
+
+    def test_deleted_attribute_value_is_exported(self):
+        self.assert_exported_after(self.product.attribute_values.first().delete)
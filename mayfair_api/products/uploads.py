@@ -0,0 +1,133 @@
+"""
+Direct-to-storage uploads for product images.
+
+Instead of streaming image bytes through an API worker, a vendor asks for
+upload targets, sends the files straight to storage, then confirms the
+uploads so ProductImage rows can be attached by storage key.
+
+With S3 (and S3-compatible stores such as MinIO) the target is a presigned
+POST that S3 itself checks for content type, size and expiry. With any other
+storage, as in local development and tests, the target is a PUT to
+``ProductImageUploadTargetView``, which writes the body to storage and stands
+in for the bucket.
+
+Each target carries a signed ``upload_id`` naming the key, the product and
+the content type, so a confirm can only attach keys this API issued for that
+product. Confirms only read the stored object's metadata, its size and
+content type, so image bytes never pass through an API worker. The
+derivative task decodes the image and drops the ProductImage if it isn't
+intact.
+"""
+
+import uuid
+from pathlib import PurePosixPath
+
+from django.core import signing
+from django.core.files.storage import default_storage
+from PIL import Image
+
+UPLOAD_PREFIX = "product_images/uploads"
+UPLOAD_EXPIRY = 60 * 15
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+MAX_UPLOADS_PER_REQUEST = 10
+# Only the types the installed Pillow can open are offered; see
+# upload_content_types().
+UPLOAD_CONTENT_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+}
+_SALT = "products.uploads"
+
+
+def is_presigned_storage(storage=default_storage):
+    # django-storages' S3Storage; anything else uses the local stand-in.
+    return hasattr(storage, "bucket_name") and hasattr(storage, "bucket")
+
+
+def upload_content_types():
+    Image.init()
+    readable = set(Image.MIME.values())
+    return [
+        content_type
+        for content_type in UPLOAD_CONTENT_TYPES
+        if content_type in readable
+    ]
+
+
+def new_upload_key(product, content_type):
+    extension = UPLOAD_CONTENT_TYPES[content_type]
+    return f"{UPLOAD_PREFIX}/{product.pk}/{uuid.uuid4().hex}{extension}"
+
+
+def sign_upload(key, product, content_type):
+    return signing.dumps({"k": key, "p": product.pk, "t": content_type}, salt=_SALT)
+
+
+def unsign_upload(upload_id, max_age=UPLOAD_EXPIRY):
+    """The signed ``{"k": key, "p": product id, "t": content type}`` payload."""
+    return signing.loads(upload_id, salt=_SALT, max_age=max_age)
+
+
+def create_upload_target(product, content_type, local_url_for):
+    """
+    Reserve a storage key for ``product`` and describe how to upload it.
+
+    ``local_url_for(upload_id)`` builds the stand-in PUT URL when storage
+    cannot presign.
+    """
+    key = new_upload_key(product, content_type)
+    upload_id = sign_upload(key, product, content_type)
+    target = {"upload_id": upload_id, "key": key, "expires_in": UPLOAD_EXPIRY}
+
+    if is_presigned_storage():
+        client = default_storage.bucket.meta.client
+        post = client.generate_presigned_post(
+            Bucket=default_storage.bucket_name,
+            Key=default_storage._normalize_name(key),  # noqa: SLF001
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, MAX_UPLOAD_SIZE],
+            ],
+            ExpiresIn=UPLOAD_EXPIRY,
+        )
+        target.update(method="POST", url=post["url"], fields=post["fields"])
+    else:
+        target.update(
+            method="PUT",
+            url=local_url_for(upload_id),
+            headers={"Content-Type": content_type},
+        )
+    return target
+
+
+def uploaded_object(key):
+    """
+    ``(size, content type)`` of an uploaded object from a HEAD request, or
+    ``None`` if nothing was uploaded.
+    """
+    if is_presigned_storage():
+        client = default_storage.bucket.meta.client
+        try:
+            head = client.head_object(
+                Bucket=default_storage.bucket_name,
+                Key=default_storage._normalize_name(key),  # noqa: SLF001
+            )
+        except client.exceptions.ClientError as error:
+            if error.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+        return head["ContentLength"], head["ContentType"]
+
+    if not default_storage.exists(key):
+        return None
+    # The stand-in PUT only stores bodies sent with the signed content type,
+    # which also picked the key's extension.
+    content_types = {
+        extension: content_type
+        for content_type, extension in UPLOAD_CONTENT_TYPES.items()
+    }
+    return default_storage.size(key), content_types.get(PurePosixPath(key).suffix)
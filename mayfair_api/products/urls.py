@@ -3,14 +3,23 @@ from .views import (
     ProductListView,
     ProductDetailView,
     CategoryListView,
+    CategoryTreeView,
     CategoryDetailView,
     ProductAttributeListView,
     ProductAttributeDetailView,
     ProductSearchSuggestionsView,
+    ProductImportView,
+    ProductBulkUpdateView,
+    ProductExportView,
+    ProductRecommendationsView,
+    ProductImageUploadView,
+    ProductImageConfirmView,
+    ProductImageUploadTargetView,
 )
 
 urlpatterns = [
     path("categories/", CategoryListView.as_view(), name="category-list"),
+    path("categories/tree/", CategoryTreeView.as_view(), name="category-tree"),
     path(
         "categories/<slug:slug>/", CategoryDetailView.as_view(), name="category-detail"
     ),
@@ -25,6 +34,29 @@ urlpatterns = [
         ProductSearchSuggestionsView.as_view(),
         name="product-list",
     ),
+    path("import/", ProductImportView.as_view(), name="product-import"),
+    path("bulk-update/", ProductBulkUpdateView.as_view(), name="product-bulk-update"),
+    path("export/", ProductExportView.as_view(), name="product-export"),
+    path(
+        "uploads/<str:upload_id>/",
+        ProductImageUploadTargetView.as_view(),
+        name="product-image-upload-target",
+    ),
+    path(
+        "<slug:slug>/images/uploads/",
+        ProductImageUploadView.as_view(),
+        name="product-image-uploads",
+    ),
+    path(
+        "<slug:slug>/images/",
+        ProductImageConfirmView.as_view(),
+        name="product-image-confirm",
+    ),
+    path(
+        "<slug:slug>/frequently-bought-together/",
+        ProductRecommendationsView.as_view(),
+        name="product-recommendations",
+    ),
     path("<slug:slug>/", ProductDetailView.as_view(), name="product-detail"),
     path("", ProductListView.as_view(), name="product-list"),
 ]
@@ -1,25 +1,92 @@
-from django.db.models import Q
 from rest_framework import generics, permissions, filters, status
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from django_filters import rest_framework as django_filters
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+
+from mayfair_api.utils.renderers import (
+    CBORRenderer,
+    MessagePackRenderer,
+    ORJSONRenderer,
+)
 
 
-from .models import Product, Category, ProductAttribute
+from .models import (
+    Product,
+    Category,
+    ProductAttribute,
+    ProductImage,
+    attribute_values_array,
+)
 from .serializers import (
     ProductSerializer,
     CategorySerializer,
     ProductAttributeSerializer,
     ProductSuggestionSerializer,
+    ProductBulkUpdateSerializer,
+    ProductExportQuerySerializer,
+    ProductRecommendationQuerySerializer,
+    ProductImageSerializer,
+    ProductImageUploadTargetsSerializer,
+    ProductImageConfirmListSerializer,
     ProductAttributeValueSerializer,
 )
 from .permissions import IsVendor, IsCustomer
 from .filters import ProductFilter  # Import the filter class we created
+from .pagination import KeysetPagination
+from .facets import compute_facets, parse_facets
+from .categories import absolute_image_urls, get_category_tree
+from .caching import ConditionalGetMixin, VersionedResponseCacheMixin
+from .querybudget import QueryBudgetMixin
+from .search import suggest_products
+from .inventory import bulk_update_stock
+from .fieldsets import (
+    EXPAND_PARAM,
+    FIELDS_PARAM,
+    requested_names,
+    sparse_product_queryset,
+)
+from .fastpath import keyset_columns, product_values, render_products
+from .cards import PrerenderedJSONRenderer, get_card_bodies
+from .cards import is_enabled as cards_enabled
+from .uploads import (
+    MAX_UPLOAD_SIZE,
+    create_upload_target,
+    is_presigned_storage,
+    unsign_upload,
+)
+from .importer import (
+    IMPORT_FORMATS,
+    ImportFileError,
+    ProductImporter,
+    detect_format,
+    iter_rows,
+)
+from .suggestions import suggestion_index
+from .popularity import POPULARITY_VERSION, VIEW, record_on_commit
+from .recommendations import recommended_product_ids
+from .export import (
+    CSVExportRenderer,
+    NDJSONExportRenderer,
+    export_chunks,
+    export_queryset,
+    streaming_content,
+)
 
 
-class ProductListView(generics.ListCreateAPIView):
+class ProductListView(
+    ConditionalGetMixin, VersionedResponseCacheMixin, generics.ListCreateAPIView
+):
     parser_classes = [MultiPartParser, FormParser]
     queryset = (
         Product.objects.filter(is_active=True)
@@ -27,6 +94,7 @@ class ProductListView(generics.ListCreateAPIView):
         .prefetch_related("images", "attribute_values", "attribute_values__attribute")
     )
     serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
     filter_backends = [
         django_filters.DjangoFilterBackend,
         # django_filters.SearchFilter,
@@ -48,6 +116,78 @@ class ProductListView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    renderer_classes = [
+        PrerenderedJSONRenderer,
+        MessagePackRenderer,
+        CBORRenderer,
+        BrowsableAPIRenderer,
+    ]
+    # Serve list GETs from values() rows instead of ProductSerializer.
+    fast_list = True
+
+    def get_extra_versions(self, request):
+        # Popularity flushes don't bump the catalog version.
+        ordering = request.query_params.get("ordering", "").split(",")
+        if any(term.strip().lstrip("-") == "popularity" for term in ordering):
+            return [POPULARITY_VERSION]
+        return []
+
+    def use_fast_list(self):
+        return (
+            self.fast_list
+            and self.request.method in permissions.SAFE_METHODS
+            and EXPAND_PARAM not in self.request.query_params
+        )
+
+    def use_cards(self):
+        # Cards hold the full default shape, encoded as JSON
+        return (
+            cards_enabled()
+            and self.use_fast_list()
+            and FIELDS_PARAM not in self.request.query_params
+            and isinstance(self.request.accepted_renderer, PrerenderedJSONRenderer)
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.use_fast_list():
+            # The fast path selects its own columns
+            return queryset
+        return sparse_product_queryset(queryset, self.request)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # ?facets=category,price,attributes adds counts for the filtered set
+        facets = parse_facets(request.query_params.get("facets"))
+        if facets:
+            facet_data = compute_facets(queryset, facets, request.query_params)
+
+        if self.use_cards():
+            rows = queryset.select_related(None).prefetch_related(None)
+            rows = rows.values(*keyset_columns(rows))
+            page = self.paginate_queryset(rows)
+            data = get_card_bodies(
+                [row["id"] for row in (rows if page is None else page)]
+            )
+        elif self.use_fast_list():
+            rows = product_values(queryset, request)
+            page = self.paginate_queryset(rows)
+            data = render_products(list(rows) if page is None else page, request)
+        else:
+            page = self.paginate_queryset(queryset)
+            data = self.get_serializer(
+                queryset if page is None else page, many=True
+            ).data
+
+        if page is not None:
+            response = self.get_paginated_response(data)
+            if facets:
+                response.data["facets"] = facet_data
+            return response
+        if facets:
+            return Response({"results": data, "facets": facet_data})
+        return Response(data)
+
     def create(self, request, *args, **kwargs):
         # Your existing create logic remains unchanged
         print("theuser", request.user)
@@ -107,10 +247,41 @@ class ProductListView(generics.ListCreateAPIView):
 #         serializer.save(vendor=self.request.user.vendor_profile)
 
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all()
+class ProductDetailView(
+    QueryBudgetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
+    # Product, vendor, category and attribute values in one query, images in a
+    # second one
+    queryset = (
+        Product.objects.select_related("vendor")
+        .prefetch_related("images")
+        .annotate(attribute_values_data=attribute_values_array())
+    )
     serializer_class = ProductSerializer
     lookup_field = "slug"
+    query_budget = 2
+
+    def get_queryset(self):
+        selected = requested_names(self.request, FIELDS_PARAM)
+        if selected is None:
+            return super().get_queryset()
+        queryset = sparse_product_queryset(
+            Product.objects.all(),
+            self.request,
+            prefetches={"images": ("images",)},
+        )
+        if "attribute_values" in selected:
+            queryset = queryset.annotate(
+                attribute_values_data=attribute_values_array()
+            )
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        # Revalidations answered with 304 by ConditionalGetMixin aren't counted.
+        record_on_commit(VIEW, [instance.pk])
+        return Response(serializer.data)
 
     # def update(self, request, *args, **kwargs):
     #     print("Request edited data:", request.data)
@@ -122,9 +293,12 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.AllowAny()]
 
 
-class CategoryListView(generics.ListCreateAPIView):
+class CategoryListView(
+    ConditionalGetMixin, VersionedResponseCacheMixin, generics.ListCreateAPIView
+):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    pagination_class = KeysetPagination
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -132,7 +306,16 @@ class CategoryListView(generics.ListCreateAPIView):
         return [permissions.AllowAny()]
 
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryTreeView(ConditionalGetMixin, generics.ListAPIView):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request, *args, **kwargs):
+        return Response(absolute_image_urls(get_category_tree(), request))
+
+
+class CategoryDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     lookup_field = "slug"
@@ -143,7 +326,9 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.AllowAny()]
 
 
-class ProductAttributeListView(generics.ListCreateAPIView):
+class ProductAttributeListView(
+    VersionedResponseCacheMixin, generics.ListCreateAPIView
+):
     queryset = ProductAttribute.objects.all()
     serializer_class = ProductAttributeSerializer
     # permission_classes = [permissions.IsAuthenticated, IsVendor]
@@ -161,16 +346,216 @@ class ProductSearchSuggestionsView(APIView):
         if not query or len(query) < 2:
             return Response([])
 
-        products = (
-            Product.objects.filter(
-                Q(name__icontains=query)
-                | Q(description__icontains=query)
-                | Q(category__name__icontains=query),
-                is_active=True,
+        # The in-memory index answers once warm; otherwise use the database.
+        products = suggestion_index.search(query, limit=10)
+        if products is None:
+            products = suggest_products(query, limit=10)
+
+        serializer = ProductSuggestionSerializer(
+            products, many=True, context={"request": request}
+        )
+        return Response(serializer.data)
+
+
+class ProductRecommendationsView(QueryBudgetMixin, APIView):
+    """
+    Active products most often bought together with ``slug``, best first;
+    ``?limit=`` caps how many. Precomputed by products.recommendations, so
+    this is one lookup plus the listing queries of the fast path.
+    """
+
+    permission_classes = [permissions.AllowAny]
+    query_budget = 4
+
+    def get(self, request, slug):
+        query = ProductRecommendationQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        product_ids = recommended_product_ids(slug)
+        if product_ids is None:
+            raise Http404
+        if not product_ids:
+            return Response([])
+
+        rows = product_values(
+            Product.objects.filter(pk__in=product_ids, is_active=True), request
+        )
+        position = {pk: index for index, pk in enumerate(product_ids)}
+        rows = sorted(rows, key=lambda row: position[row["id"]])
+        return Response(render_products(rows[: query.validated_data["limit"]], request))
+
+
+# Each import chunk commits on its own so a bad row late in a large file
+# doesn't roll back everything before it.
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
+class ProductImportView(APIView):
+    parser_classes = [MultiPartParser]
+    permission_classes = [permissions.IsAuthenticated, IsVendor]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"file": ["No file was submitted."]},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            .select_related("category")
-            .prefetch_related("images")[:10]
+        file_format = request.data.get("format") or detect_format(
+            upload.name, upload.content_type or ""
         )
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {"format": [f"Expected one of: {', '.join(IMPORT_FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        serializer = ProductSuggestionSerializer(products, many=True)
-        return Response(serializer.data)
+        importer = ProductImporter(request.user.vendor_profile)
+        try:
+            report = importer.run(iter_rows(upload.file, file_format))
+        except ImportFileError as error:
+            return Response({"file": [str(error)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report["created"] else status.HTTP_200_OK,
+        )
+
+
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
+class ProductExportView(APIView):
+    """
+    Stream the active catalog as NDJSON (default) or CSV (``?format=csv``),
+    optionally only products updated since ``?updated_since=``.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [NDJSONExportRenderer, CSVExportRenderer]
+
+    def handle_exception(self, exc):
+        # Errors are reported as JSON whichever export format was asked for.
+        self.request.accepted_renderer = ORJSONRenderer()
+        self.request.accepted_media_type = ORJSONRenderer.media_type
+        return super().handle_exception(exc)
+
+    def get(self, request):
+        query = ProductExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        renderer = request.accepted_renderer
+        chunks = export_chunks(
+            export_queryset(query.validated_data.get("updated_since")),
+            renderer.format,
+            request,
+        )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = StreamingHttpResponse(
+            streaming_content(chunks, request._request),  # noqa: SLF001
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="products.{renderer.format}"'
+        )
+        return response
+
+
+class ProductBulkUpdateView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsVendor]
+
+    def patch(self, request):
+        serializer = ProductBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = bulk_update_stock(
+            request.user.vendor_profile, serializer.validated_data["products"]
+        )
+        return Response(result)
+
+
+class VendorProductMixin:
+    permission_classes = [permissions.IsAuthenticated, IsVendor]
+
+    def get_product(self, slug):
+        return get_object_or_404(
+            Product, slug=slug, vendor=self.request.user.vendor_profile
+        )
+
+
+class ProductImageUploadView(VendorProductMixin, APIView):
+    """Issue direct-to-storage upload targets for a product's images."""
+
+    def post(self, request, slug):
+        product = self.get_product(slug)
+        serializer = ProductImageUploadTargetsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        def local_url_for(upload_id):
+            return request.build_absolute_uri(
+                reverse("product-image-upload-target", args=[upload_id])
+            )
+
+        targets = [
+            create_upload_target(product, item["content_type"], local_url_for)
+            for item in serializer.validated_data["files"]
+        ]
+        return Response({"uploads": targets}, status=status.HTTP_201_CREATED)
+
+
+class ProductImageConfirmView(VendorProductMixin, APIView):
+    """Attach uploaded files to a product as ProductImage rows by storage key."""
+
+    def post(self, request, slug):
+        product = self.get_product(slug)
+        serializer = ProductImageConfirmListSerializer(
+            data=request.data, context={"product": product}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        images = []
+        for upload in serializer.validated_data["uploads"]:
+            # Confirming the same upload twice returns the existing row.
+            image, _ = ProductImage.objects.get_or_create(
+                product=product,
+                image=upload["upload_id"],
+                defaults={
+                    "alt_text": upload.get("alt_text", ""),
+                    "is_feature": upload["is_feature"],
+                },
+            )
+            images.append(image)
+        return Response(
+            ProductImageSerializer(
+                images, many=True, context={"request": request}
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class ProductImageUploadTargetView(APIView):
+    """
+    Stand-in for a presigned bucket URL when storage can't presign (local
+    development and tests). The signed upload id is the only credential.
+    """
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def put(self, request, upload_id):
+        if is_presigned_storage():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        try:
+            upload = unsign_upload(upload_id)
+        except signing.BadSignature:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        if request.content_type != upload["t"]:
+            return Response(
+                {"detail": f"Content-Type must be {upload['t']}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        body = request.stream.read(MAX_UPLOAD_SIZE + 1) if request.stream else b""
+        if not body:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        if len(body) > MAX_UPLOAD_SIZE:
+            return Response(status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if default_storage.exists(upload["k"]):
+            return Response(status=status.HTTP_409_CONFLICT)
+        default_storage.save(upload["k"], ContentFile(body))
+        return Response(status=status.HTTP_204_NO_CONTENT)
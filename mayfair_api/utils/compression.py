@@ -0,0 +1,180 @@
+"""
+Negotiated compression of API responses.
+
+``CompressionMiddleware`` picks zstd, brotli or gzip from ``Accept-Encoding``
+(client q-values first, then ``ENCODINGS`` order) and compresses API content
+types only. HTML, such as the browsable API, is left alone, since pages
+that carry CSRF tokens are what BREACH-style attacks need. Bodies under
+``MIN_COMPRESS_SIZE`` bytes are sent as they are.
+
+Streaming responses are compressed incrementally, flushing after each
+chunk so clients still receive data as it is produced.
+
+Responses served by ``VersionedResponseCacheMixin`` carry their cache key;
+their compressed bytes are cached next to the cached data under
+``<key>:<encoding>``, so a hot page is compressed once per version rather
+than on every hit.
+"""
+
+import zlib
+
+import brotli
+import zstandard
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+# Preference when a client accepts several encodings equally.
+ENCODINGS = ("zstd", "br", "gzip")
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/cbor",
+    "application/x-ndjson",
+    "text/csv",
+)
+ZSTD_LEVEL = 3
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+
+def negotiate_encoding(accept_encoding):
+    """The encoding to use for an ``Accept-Encoding`` value, or ``None``."""
+    accepted = {}
+    for entry in accept_encoding.split(","):
+        name, *params = entry.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    default = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level=None):
+    """``data`` in ``encoding``, at ``level`` or the level the middleware uses."""
+    if level is None:
+        level = {"zstd": ZSTD_LEVEL, "br": BROTLI_QUALITY}.get(encoding, GZIP_LEVEL)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def stream_compressor(encoding):
+    """
+    ``(compress_chunk, finish)`` for incremental compression; each
+    ``compress_chunk`` output can be decoded as soon as it is received.
+    """
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    elif encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return (
+            lambda chunk: compressor.process(chunk) + compressor.flush(),
+            compressor.finish,
+        )
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        flush_mode = zlib.Z_SYNC_FLUSH
+    return (
+        lambda chunk: compressor.compress(chunk) + compressor.flush(flush_mode),
+        compressor.flush,
+    )
+
+
+def compress_stream(chunks, encoding):
+    compress_chunk, finish = stream_compressor(encoding)
+    for chunk in chunks:
+        if data := compress_chunk(chunk):
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compress_chunk, finish = stream_compressor(encoding)
+    async for chunk in chunks:
+        if data := compress_chunk(chunk):
+            yield data
+    yield finish()
+
+
+def is_compressible(response):
+    content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+def compressed_content(response, encoding):
+    """
+    Compress ``response.content``, reusing the bytes cached for a response
+    cache hit and refreshing them on a miss.
+    """
+    key = getattr(response, "response_cache_key", None)
+    if key is None:
+        return compress(response.content, encoding)
+
+    key = f"{key}:{encoding}"
+    if response.get("X-Cache") == "HIT":
+        content = cache.get(key)
+        if content is not None:
+            return content
+    content = compress(response.content, encoding)
+    cache.set(key, content, response.response_cache_timeout)
+    return content
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress API responses with the best encoding the client accepts.
+    Like ``GZipMiddleware``, set ``Vary: Accept-Encoding`` and weaken strong
+    ETags on compressed responses.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or not is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < MIN_COMPRESS_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = compress_stream(
+                    response.streaming_content, encoding
+                )
+            del response.headers["Content-Length"]
+        else:
+            content = compressed_content(response, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
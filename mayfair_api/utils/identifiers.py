@@ -0,0 +1,80 @@
+"""
+Batch allocation of unique slug-like identifiers.
+
+Instead of probing one candidate at a time with ``exists()``, a whole batch of
+candidates for one or more unique fields is checked with a single query.
+Values that are already taken, in the database or earlier in the same batch,
+get a random suffix and are checked again, up to ``ALLOCATION_ATTEMPTS`` times.
+
+Allocation can still race with a concurrent insert, so callers that save the
+result should retry on ``IntegrityError``; ``Product.save`` and the product
+importer do.
+"""
+
+import string
+
+from django.db.models import Q
+from django.utils.crypto import get_random_string
+
+ALLOCATION_ATTEMPTS = 5
+SUFFIX_LENGTH = 6
+SUFFIX_CHARS = string.ascii_lowercase + string.digits
+
+
+def _candidate(base, max_length, suffixed):
+    if not suffixed:
+        return base[:max_length]
+    suffix = get_random_string(SUFFIX_LENGTH, SUFFIX_CHARS)
+    base = base[: max_length - SUFFIX_LENGTH - 1].rstrip("-")
+    return f"{base}-{suffix}" if base else suffix
+
+
+def allocate_unique(model, fields, bare=()):
+    """
+    Reserve one unique value per base for each field of ``model``.
+
+    ``fields`` maps a field name to a list of bases, e.g.
+    ``{"slug": ["red-shoe", "red-shoe"], "sku": ["PROD", "PROD"]}``, and the
+    result maps each field to a list of values in the same order. Fields named
+    in ``bare`` try the base on its own first; other fields always get a
+    random suffix. Every attempt is one query, whatever the batch size.
+    """
+    values = {name: [None] * len(bases) for name, bases in fields.items()}
+    pending = {name: list(range(len(bases))) for name, bases in fields.items()}
+
+    for attempt in range(ALLOCATION_ATTEMPTS):
+        candidates = {}
+        for name, indexes in pending.items():
+            max_length = model._meta.get_field(name).max_length
+            seen = {value for value in values[name] if value is not None}
+            for index in indexes:
+                base = fields[name][index] or ""
+                suffixed = attempt > 0 or name not in bare or not base
+                candidate = _candidate(base, max_length, suffixed)
+                while candidate in seen:
+                    candidate = _candidate(base, max_length, suffixed=True)
+                seen.add(candidate)
+                candidates.setdefault(name, {})[index] = candidate
+        if not candidates:
+            return values
+
+        query = Q()
+        for name, by_index in candidates.items():
+            query |= Q(**{f"{name}__in": list(by_index.values())})
+        taken = {name: set() for name in candidates}
+        for row in model._base_manager.filter(query).values_list(*candidates):
+            for name, value in zip(candidates, row, strict=True):
+                taken[name].add(value)
+
+        pending = {}
+        for name, by_index in candidates.items():
+            for index, candidate in by_index.items():
+                if candidate in taken[name]:
+                    pending.setdefault(name, []).append(index)
+                else:
+                    values[name][index] = candidate
+        if not pending:
+            return values
+
+    msg = f"Could not allocate unique {', '.join(pending)} for {model.__name__}"
+    raise ValueError(msg)
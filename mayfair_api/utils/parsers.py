@@ -0,0 +1,58 @@
+import cbor2
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import CBORRenderer, MessagePackRenderer, ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser reading UTF-8 request bodies with orjson. orjson rejects
+    ``NaN`` and ``Infinity`` like ``STRICT_JSON`` does; other encodings and
+    non-strict parsing fall back to the stdlib parser.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if not self.strict or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            msg = f"JSON parse error - {exc}"
+            raise ParseError(msg) from exc
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack request bodies; timestamps decode to aware datetimes."""
+
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), timestamp=3)
+        except (ValueError, msgpack.UnpackException) as exc:
+            msg = f"MessagePack parse error - {str(exc) or type(exc).__name__}"
+            raise ParseError(msg) from exc
+
+
+class CBORParser(BaseParser):
+    """CBOR request bodies; tagged decimals and datetimes decode natively."""
+
+    media_type = "application/cbor"
+    renderer_class = CBORRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except (ValueError, cbor2.CBORDecodeError) as exc:
+            msg = f"CBOR parse error - {str(exc) or type(exc).__name__}"
+            raise ParseError(msg) from exc
@@ -0,0 +1,97 @@
+"""
+API renderers.
+
+``ORJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` with the
+default settings (compact, unescaped unicode, ``\\u2028``/``\\u2029`` escaped):
+datetimes, decimals and other non-JSON types still go through DRF's
+``JSONEncoder.default``, so ``2025-01-01T10:00:00.123456Z`` and float decimals
+come out exactly as before. Serializer fields already turn prices into
+strings, so those never reach the encoder.
+
+Indented output (``Accept: application/json; indent=4`` and the browsable
+API) and non-default ``UNICODE_JSON``/``COMPACT_JSON`` settings use the
+stdlib renderer, since orjson only offers two-space indentation and always
+writes UTF-8.
+
+``MessagePackRenderer`` (``application/msgpack``) and ``CBORRenderer``
+(``application/cbor``) encode the same data for clients that ask for them
+with ``Accept`` or ``?format=msgpack|cbor``. Serializer output is the same as
+for JSON, so decimal fields such as ``price`` stay exact strings and
+datetimes stay ISO 8601 strings. Raw values use each format's own types
+where it has one:
+
+- ``Decimal``: CBOR decimal fraction (tag 4); a string in MessagePack,
+  which has no decimal type.
+- ``datetime``: CBOR date/time string (tag 0), naive values being taken as
+  ``TIME_ZONE``; the MessagePack timestamp extension (type -1) when aware.
+- other types CBOR has tags for, such as dates and UUIDs, use them;
+  everything else gets the value ``JSONRenderer`` would write.
+"""
+
+import decimal
+
+import cbor2
+import msgpack
+import orjson
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        body = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        # Keep the output a strict JavaScript subset, as JSONRenderer does.
+        return body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return _encoder.default(obj)
+
+
+def _cbor_default(encoder, obj):
+    encoder.encode(_encoder.default(obj))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_msgpack_default, datetime=True)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = "application/cbor"
+    format = "cbor"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return cbor2.dumps(
+            data, default=_cbor_default, timezone=timezone.get_default_timezone()
+        )